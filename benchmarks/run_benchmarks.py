@@ -0,0 +1,351 @@
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import generate_sentences, write_csv_corpus
+from code.backend import MarkovChain, MarkovChainBackoff, NGramModel, Parser
+
+
+COLUMN_NAMES = ['previous_utterance', 'free_messages', 'guided_messages']
+
+
+'''
+Desc: Summarizes measured call latencies
+Params:
+    latencies_ns: list - The latency of every call in nanoseconds
+Returns: dict - Count, mean, p50 and p99 latency in microseconds
+'''
+def summarize_latencies(latencies_ns):
+    latencies_us = np.array(latencies_ns, dtype=np.float64) / 1000
+    return {
+        'count': len(latencies_us),
+        'mean_us': round(float(latencies_us.mean()), 3),
+        'p50_us': round(float(np.percentile(latencies_us, 50)), 3),
+        'p99_us': round(float(np.percentile(latencies_us, 99)), 3)
+    }
+
+
+'''
+Desc: Measures the latency of every single call of a function
+Params:
+    function: callable - The function to measure
+    arguments: list - The argument of every call
+Returns: dict - The latency summary
+'''
+def measure_latency(function, arguments):
+    latencies_ns = []
+    for argument in arguments:
+        start = time.perf_counter_ns()
+        function(argument)
+        latencies_ns.append(time.perf_counter_ns() - start)
+
+    return summarize_latencies(latencies_ns)
+
+
+'''
+Desc: Measures the build time and the peak memory of building a model, the time is
+      measured without memory tracing because tracing slows the build down
+Params:
+    build: callable - Builds and returns the model
+Returns: tuple - The model and a dict with build time and peak memory
+'''
+def measure_build(build):
+    start = time.perf_counter()
+    model = build()
+    build_seconds = time.perf_counter() - start
+
+    del model
+    tracemalloc.start()
+    model = build()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return model, {'build_seconds': round(build_seconds, 4), 'peak_memory_mb': round(peak_bytes / 2**20, 3)}
+
+
+'''
+Desc: Measures how fast the parser reads the synthetic corpus written as CSV files
+Params:
+    sentences: list - Tokenized sentences to write
+    workers: int - Number of parser worker processes
+Returns: dict - Parse time and throughput
+'''
+def benchmark_parse(sentences, workers):
+    with tempfile.TemporaryDirectory() as folder_path:
+        bytes_written = write_csv_corpus(folder_path, sentences, COLUMN_NAMES)
+
+        start = time.perf_counter()
+        parsed_data = Parser().parse_data(folder_path, COLUMN_NAMES, workers=workers)
+        parse_seconds = time.perf_counter() - start
+
+    return {
+        'workers': workers,
+        'input_mb': round(bytes_written / 2**20, 3),
+        'parse_seconds': round(parse_seconds, 4),
+        'sentences_per_second': round(len(parsed_data) / parse_seconds, 1),
+        'mb_per_second': round(bytes_written / 2**20 / parse_seconds, 3)
+    }
+
+
+'''
+Desc: Picks query contexts and partial words from held out sentences
+Params:
+    sentences: list - Held out tokenized sentences
+    context_length: int - The number of context words
+    count: int - The number of queries
+    rng: np.random.Generator - The random generator
+Returns: list - Pairs of context words and the word following them
+'''
+def sample_queries(sentences, context_length, count, rng):
+    candidates = [sentence for sentence in sentences if len(sentence) > context_length]
+    queries = []
+    for i in rng.integers(len(candidates), size=count).tolist():
+        sentence = candidates[i]
+        start = int(rng.integers(len(sentence) - context_length))
+        queries.append((sentence[start:start + context_length], sentence[start + context_length]))
+
+    return queries
+
+
+'''
+Desc: Gets the partial word typed so far of the word following a query context
+Params:
+    word: str - The word following the context
+Returns: str - The first one to three letters of the word
+'''
+def get_partial_word(word):
+    return word[:max(1, min(3, len(word) - 1))]
+
+
+'''
+Desc: Builds the Markov chains of every order and measures the single order queries
+Params:
+    sentences: list - Tokenized training sentences
+    held_out: list - Tokenized held out sentences for the queries
+    max_order: int - The highest order
+    query_count: int - The number of queries for every measurement
+    rng: np.random.Generator - The random generator
+Returns: tuple - The Markov chains from the highest order to the lowest and the results of every order
+'''
+def benchmark_markov_chains(sentences, held_out, max_order, query_count, rng):
+    markov_chains = []
+    results = {}
+    for n in range(1, max_order + 1):
+        markov_chain, build_results = measure_build(lambda: MarkovChain(sentences, n))
+        markov_chains.insert(0, markov_chain)
+
+        queries = sample_queries(held_out, n, query_count, rng)
+        prefix_states = [tuple(context[1:]) + (get_partial_word(word),) for context, word in queries]
+        results[str(n)] = {
+            **build_results,
+            'get_words': measure_latency(markov_chain.get_words, [tuple(context) for context, _ in queries]),
+            'get_words_with_prefix': measure_latency(markov_chain.get_words_with_prefix, prefix_states)
+        }
+
+    return markov_chains, results
+
+
+'''
+Desc: Measures the backoff queries of a model the way the editor asks them
+Params:
+    model: object - The model with predict_next_words and predict_word_endings methods
+    held_out: list - Tokenized held out sentences for the queries
+    query_count: int - The number of queries for every measurement
+    rng: np.random.Generator - The random generator
+Returns: dict - The latency summaries
+'''
+def benchmark_backoff(model, held_out, query_count, rng):
+    queries = sample_queries(held_out, model.max_order, query_count, rng)
+    return {
+        'predict_next_words': measure_latency(model.predict_next_words, [context for context, _ in queries]),
+        'predict_word_endings': measure_latency(
+            model.predict_word_endings,
+            [context[1:] + [get_partial_word(word)] for context, word in queries]
+        )
+    }
+
+
+'''
+Desc: Collects the queries of typing the held out sentences, the next words are asked before every word
+      and the endings after its first letters, so the batches repeat queries as often as typing does
+Params:
+    held_out: list - Tokenized held out sentences for the queries
+    max_order: int - The highest order of the model
+    count: int - The number of queries of every kind
+Returns: dict - The contexts and the partial words of the next word and of the word ending queries
+'''
+def collect_typing_queries(held_out, max_order, count):
+    queries = {'next_words': ([], []), 'word_endings': ([], [])}
+    for sentence in held_out:
+        for i in range(1, len(sentence)):
+            queries['next_words'][0].append(sentence[max(0, i - max_order):i])
+            queries['next_words'][1].append(None)
+            queries['word_endings'][0].append(sentence[max(0, i - max_order + 1):i])
+            queries['word_endings'][1].append(get_partial_word(sentence[i]))
+
+        if len(queries['next_words'][0]) >= count:
+            break
+
+    return {kind: (contexts[:count], partial_words[:count]) for kind, (contexts, partial_words) in queries.items()}
+
+
+'''
+Desc: Measures answering queries one by one and in batches of several sizes
+Params:
+    model: object - The model with predict_next_words, predict_word_endings and predict_batch methods
+    contexts: list - The words preceding the next word or the partial word of every query
+    partial_words: list - The partial word of every query, None for next word queries
+    batch_sizes: list - The numbers of queries of a batch, None answers all queries in one batch
+Returns: dict - The time of the single queries and of every batch size with its speedup
+'''
+def measure_batches(model, contexts, partial_words, batch_sizes):
+    # like timeit the garbage collector is off, a full collection walks every node of the model and
+    # would land in whichever measurement happens to allocate the object that triggers it
+    gc.collect()
+    gc.disable()
+
+    # the answers are kept like the batch keeps them
+    start = time.perf_counter()
+    results = [
+        model.predict_next_words(context) if partial_word is None else model.predict_word_endings(context + [partial_word])
+        for context, partial_word in zip(contexts, partial_words)
+    ]
+    loop_seconds = time.perf_counter() - start
+    del results
+
+    measurements = {'queries': len(contexts), 'loop_seconds': round(loop_seconds, 4)}
+    for batch_size in batch_sizes:
+        size = batch_size or len(contexts)
+        results = []
+        start = time.perf_counter()
+        for i in range(0, len(contexts), size):
+            results.extend(model.predict_batch(contexts[i:i + size], partial_words[i:i + size]))
+        batch_seconds = time.perf_counter() - start
+        del results
+
+        name = f'batch_{batch_size}' if batch_size else 'batch_all'
+        measurements[f'{name}_seconds'] = round(batch_seconds, 4)
+        measurements[f'{name}_speedup'] = round(loop_seconds / batch_seconds, 2)
+
+    gc.enable()
+    return measurements
+
+
+'''
+Desc: Measures the batch API against single queries on the queries of typing held out sentences,
+      in small batches like a server collects them and in one batch like an offline evaluation
+Params:
+    model: object - The model with predict_next_words, predict_word_endings and predict_batch methods
+    held_out: list - Tokenized held out sentences for the queries
+    query_count: int - The number of queries of every kind
+Returns: dict - The measurements of the next word and the word ending queries
+'''
+def benchmark_batch(model, held_out, query_count):
+    return {
+        kind: measure_batches(model, contexts, partial_words, [64, None])
+        for kind, (contexts, partial_words) in collect_typing_queries(held_out, model.max_order, query_count).items()
+    }
+
+
+'''
+Desc: Gets the commit the benchmarks run on
+Params: None
+Returns: str - The commit hash or None outside of a git repository
+'''
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+'''
+Desc: Runs all benchmarks
+Params:
+    args: argparse.Namespace - The command line arguments
+Returns: dict - The machine readable results
+'''
+def run_benchmarks(args):
+    rng = np.random.default_rng(args.seed)
+    corpus_arguments = {'vocabulary_size': args.vocabulary, 'zipf_exponent': args.zipf_exponent}
+    sentences = generate_sentences(args.sentences, seed=args.seed, **corpus_arguments)
+    held_out = generate_sentences(max(args.queries, args.batch_queries // 5, 1000), seed=args.seed + 1, **corpus_arguments)
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': get_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'corpus': {'sentences': len(sentences), 'words': sum(len(sentence) for sentence in sentences)}
+    }
+
+    if not args.skip_parse:
+        results['parse'] = benchmark_parse(sentences, args.workers)
+
+    markov_chains, results['markov_chain'] = benchmark_markov_chains(
+        sentences, held_out, args.max_order, args.queries, rng
+    )
+    backoff = MarkovChainBackoff(markov_chains)
+    results['markov_chain_backoff'] = {
+        **benchmark_backoff(backoff, held_out, args.queries, rng),
+        'predict_batch': benchmark_batch(backoff, held_out, args.batch_queries)
+    }
+    del markov_chains, backoff
+
+    ngram_model, build_results = measure_build(lambda: NGramModel(sentences, args.max_order))
+    results['ngram_model'] = {
+        **build_results,
+        **benchmark_backoff(ngram_model, held_out, args.queries, rng),
+        'predict_batch': benchmark_batch(ngram_model, held_out, args.batch_queries)
+    }
+
+    compact_model, build_results = measure_build(ngram_model.to_compact_model)
+    results['compact_ngram_model'] = {
+        **build_results,
+        **benchmark_backoff(compact_model, held_out, args.queries, rng),
+        'predict_batch': benchmark_batch(compact_model, held_out, args.batch_queries)
+    }
+
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmarks parsing, building and querying on a synthetic corpus')
+    arg_parser.add_argument('--sentences', type=int, default=50000, help='number of training sentences')
+    arg_parser.add_argument('--vocabulary', type=int, default=5000, help='number of distinct words')
+    arg_parser.add_argument('--zipf-exponent', type=float, default=1.1)
+    arg_parser.add_argument('--max-order', type=int, default=3)
+    arg_parser.add_argument('--queries', type=int, default=5000, help='number of queries for every latency measurement')
+    arg_parser.add_argument('--batch-queries', type=int, default=20000, help='number of queries of every kind for the batch measurements')
+    arg_parser.add_argument('--workers', type=int, default=1, help='number of parser worker processes')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--skip-parse', action='store_true', help='skip the parser benchmark')
+    arg_parser.add_argument('--output', help='path of the JSON file to write the results to, printed if omitted')
+    args = arg_parser.parse_args()
+
+    results = json.dumps(run_benchmarks(args), indent=4)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(results)
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+SYLLABLES = [
+    consonant + vowel
+    for consonant in 'bcdfghjklmnprstvwz'
+    for vowel in 'aeiou'
+]
+
+
+'''
+Desc: Generates a vocabulary of distinct made up words, shorter words come first
+      so that frequent words are short as in natural language
+Params:
+    size: int - The number of words
+    rng: np.random.Generator - The random generator
+Returns: list - The words ordered by their rank
+'''
+def generate_vocabulary(size, rng):
+    words = {}
+    syllable_count = 1
+    while len(words) < size:
+        # more syllables are needed once most short words are taken
+        candidates = len(SYLLABLES) ** syllable_count
+        for _ in range(min(size - len(words), candidates)):
+            word = ''.join(SYLLABLES[i] for i in rng.integers(len(SYLLABLES), size=syllable_count))
+            words[word] = None
+        syllable_count += 1
+
+    return list(words)[:size]
+
+
+'''
+Desc: Generates tokenized sentences with Zipf distributed word frequencies, the same
+      arguments always generate the same sentences
+Params:
+    sentence_count: int - The number of sentences
+    vocabulary_size: int - The number of distinct words (default: 5000)
+    zipf_exponent: float - The exponent of the word rank distribution (default: 1.1)
+    min_length: int - The minimal number of words of a sentence (default: 3)
+    max_length: int - The maximal number of words of a sentence (default: 20)
+    seed: int - The seed of the random generator (default: 0)
+Returns: list - Tokenized sentences
+'''
+def generate_sentences(sentence_count, vocabulary_size=5000, zipf_exponent=1.1, min_length=3, max_length=20, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(generate_vocabulary(vocabulary_size, rng), dtype=object)
+
+    probabilities = 1.0 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+    probabilities /= probabilities.sum()
+
+    lengths = rng.integers(min_length, max_length + 1, size=sentence_count)
+    words = vocabulary[rng.choice(vocabulary_size, size=int(lengths.sum()), p=probabilities)].tolist()
+
+    sentences = []
+    start = 0
+    for length in lengths.tolist():
+        sentences.append(words[start:start + length])
+        start += length
+
+    return sentences
+
+
+'''
+Desc: Writes sentences as CSV files the parser can read, every row holds a few
+      sentences with capitalization and punctuation in every column
+Params:
+    folder_path: str - Path to the folder to write the CSV files to
+    sentences: list - Tokenized sentences
+    column_names: list - Names of the text columns
+    sentences_per_row: int - The number of sentences in a cell (default: 3)
+    rows_per_file: int - The number of rows of a CSV file (default: 10000)
+Returns: int - The number of bytes written
+'''
+def write_csv_corpus(folder_path, sentences, column_names, sentences_per_row=3, rows_per_file=10000):
+    os.makedirs(folder_path, exist_ok=True)
+    terminators = ['.', '.', '.', '?', '!']
+
+    cells = []
+    for i in range(0, len(sentences), sentences_per_row):
+        cells.append(' '.join(
+            ' '.join(sentence).capitalize() + terminators[(i + j) % len(terminators)]
+            for j, sentence in enumerate(sentences[i:i + sentences_per_row])
+        ))
+
+    # the parser does not accept empty cells, the last row is filled up with the first cells
+    rows = [cells[i:i + len(column_names)] for i in range(0, len(cells), len(column_names))]
+    if rows:
+        rows[-1] = rows[-1] + cells[:len(column_names) - len(rows[-1])]
+
+    bytes_written = 0
+    for file_index, start in enumerate(range(0, len(rows), rows_per_file)):
+        file_path = os.path.join(folder_path, f'synthetic_{file_index:04d}.csv')
+        pd.DataFrame(rows[start:start + rows_per_file], columns=column_names).to_csv(file_path, index=False)
+        bytes_written += os.path.getsize(file_path)
+
+    return bytes_written
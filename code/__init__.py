@@ -1,4 +1,18 @@
-from .backend import MarkovChain, Parser
-from .frontend import Window
-
 __all__ = ['MarkovChain', 'Parser', 'Window']
+
+
+'''
+Desc: Imports the classes on first use, so the backend and the server can be used without PyQt
+      and the window can be shown before the backend imports numpy and pandas
+Params:
+    name: str - The name of the attribute
+Returns: type - The class
+'''
+def __getattr__(name):
+    if name == 'Window':
+        from .frontend import Window
+        return Window
+    if name in ('MarkovChain', 'Parser'):
+        from . import backend
+        return getattr(backend, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
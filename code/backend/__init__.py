@@ -1,4 +1,37 @@
-from .markov_chain import MarkovChain
-from .parser import Parser
+import importlib
 
-__all__ = ['MarkovChain', 'Parser']
\ No newline at end of file
+__all__ = ['MarkovChain', 'MarkovChainShard', 'CompactMarkovChain', 'DiskMarkovChain', 'NGramModel', 'CompactNGramModel', 'load_snapshot', 'save_snapshot', 'MarkovChainBackoff', 'SuggestionCache', 'TokenCorpus', 'Parser', 'append_learned_sentences', 'load_learned_sentences']
+
+# the modules are imported on first use, so that the window can be shown
+# before numpy, pandas and NLTK are imported
+_modules = {
+    'MarkovChain': '.markov_chain',
+    'MarkovChainShard': '.markov_chain_shard',
+    'CompactMarkovChain': '.compact_markov_chain',
+    'DiskMarkovChain': '.disk_markov_chain',
+    'NGramModel': '.ngram_model',
+    'CompactNGramModel': '.compact_ngram_model',
+    'load_snapshot': '.snapshot',
+    'save_snapshot': '.snapshot',
+    'MarkovChainBackoff': '.backoff',
+    'SuggestionCache': '.suggestion_cache',
+    'TokenCorpus': '.token_corpus',
+    'Parser': '.parser',
+    'append_learned_sentences': '.learned_sentences',
+    'load_learned_sentences': '.learned_sentences'
+}
+
+
+'''
+Desc: Imports an exported class or function from its module on first use
+Params:
+    name: str - The name of the attribute
+Returns: object - The class or function
+'''
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_modules[name], __name__), name)
+    globals()[name] = value
+    return value
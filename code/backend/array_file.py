@@ -0,0 +1,104 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+
+ARRAY_ALIGNMENT = 64
+
+# magic, format version and length of the JSON header
+_PREAMBLE = struct.Struct('<8sII')
+
+
+'''
+Desc: Rounds an offset up to the array alignment of the file
+Params:
+    offset: int - The offset to align
+Returns: int - The aligned offset
+'''
+def _align(offset):
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+
+'''
+Desc: Saves arrays to a versioned binary file, the file holds a small JSON header
+      followed by the aligned raw arrays
+Params:
+    file_path: str - Path to the file
+    magic: bytes - The 8 bytes identifying the kind of file
+    version: int - The version of the format
+    header: dict - The fields of the JSON header, the layout of the arrays is added to it
+    arrays: dict - The arrays by name
+Returns: None
+'''
+def save_arrays(file_path, magic, version, header, arrays):
+    array_headers = {}
+    header = dict(header, arrays=array_headers)
+
+    # offsets depend on the header length, so lay out the arrays until the header stops growing
+    header_bytes = b''
+    while True:
+        offset = _align(_PREAMBLE.size + len(header_bytes))
+        for name, array in arrays.items():
+            array_headers[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _align(offset + array.nbytes)
+
+        new_header_bytes = json.dumps(header).encode('utf-8')
+        if new_header_bytes == header_bytes:
+            break
+        header_bytes = new_header_bytes
+
+    with open(file_path, 'wb') as file:
+        file.write(_PREAMBLE.pack(magic, version, len(header_bytes)))
+        file.write(header_bytes)
+        for name, array in arrays.items():
+            file.seek(array_headers[name]['offset'])
+            file.write(np.ascontiguousarray(array).tobytes())
+
+
+'''
+Desc: Checks whether a file starts with the given magic
+Params:
+    file_path: str - Path to the file
+    magic: bytes - The 8 bytes identifying the kind of file
+Returns: bool - True if the file starts with the magic
+'''
+def has_magic(file_path, magic):
+    with open(file_path, 'rb') as file:
+        return file.read(len(magic)) == magic
+
+
+'''
+Desc: Loads arrays saved by save_arrays, the file is memory-mapped so the arrays
+      are paged in lazily when they are read
+Params:
+    file_path: str - Path to the file
+    magic: bytes - The 8 bytes identifying the kind of file
+    version: int - The expected version of the format
+    kind: str - The kind of file named in errors
+Returns: tuple - The JSON header and the arrays by name
+'''
+def load_arrays(file_path, magic, version, kind):
+    with open(file_path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    file_magic, file_version, header_length = _PREAMBLE.unpack_from(buffer, 0)
+    if file_magic != magic:
+        raise ValueError(f"Not a {kind}: {file_path}")
+    if file_version != version:
+        raise ValueError(f"Unsupported {kind} version {file_version}, expected {version}")
+
+    header = json.loads(buffer[_PREAMBLE.size:_PREAMBLE.size + header_length].decode('utf-8'))
+
+    arrays = {}
+    for name, array_header in header['arrays'].items():
+        dtype = np.dtype(array_header['dtype'])
+        shape = tuple(array_header['shape'])
+        count = int(np.prod(shape))
+        if count == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=array_header['offset']).reshape(shape)
+
+    return header, arrays
@@ -0,0 +1,108 @@
+from .batch import predict_grouped
+
+
+'''
+Desc: Merges suggestions of the highest order first and removes duplicates
+Params:
+    suggestions_by_order: iterable - Lists of suggestions from the highest order to the lowest
+    top_k: int - The number of suggestions to return
+Returns: list - Up to top_k merged suggestions
+'''
+def merge_suggestions(suggestions_by_order, top_k):
+    words = {}
+    for suggestions in suggestions_by_order:
+        words.update(dict.fromkeys(suggestions))
+        if len(words) >= top_k:
+            break
+
+    return list(words)[:top_k]
+
+
+
+class MarkovChainBackoff:
+
+    def __init__(self, markov_chains, top_k=3):
+        # markov chains are ordered from the highest order to the lowest
+        self._markov_chains = markov_chains
+        self.max_order = len(markov_chains)
+        self.top_k = top_k
+        # increases whenever the model learns, cached suggestions of older versions are outdated
+        self.version = 0
+
+
+    '''
+    Desc: Retrieves the top k possible next states, probing the Markov chains from the highest order
+    Params:
+        last_state: list - The last state(s) to use as context
+        use_prefix: bool - Whether to use prefix matching (default: False)
+    Returns: list - Up to top_k possible next states
+    '''
+    def _get_top_k_possible_states(self, last_state, use_prefix=False):
+        suggestions_by_order = (
+            self._get_states_of_order(i, markov_chain, last_state, use_prefix)
+            for i, markov_chain in enumerate(self._markov_chains)
+        )
+        return merge_suggestions(suggestions_by_order, self.top_k)
+
+
+    '''
+    Desc: Retrieves the possible next states of a single Markov chain
+    Params:
+        i: int - The index of the Markov chain
+        markov_chain: MarkovChain - The Markov chain to probe
+        last_state: list - The last state(s) to use as context
+        use_prefix: bool - Whether to use prefix matching
+    Returns: list - The possible next states of the Markov chain
+    '''
+    def _get_states_of_order(self, i, markov_chain, last_state, use_prefix):
+        look_back_words = -(self.max_order - i)
+        if use_prefix:
+            top_k_words = markov_chain.get_words_with_prefix(tuple(last_state[look_back_words:]))
+        else:
+            top_k_words = markov_chain.get_words(tuple(last_state[look_back_words:]))
+
+        return [val[0] for val in top_k_words]
+
+
+    '''
+    Desc: Learns from new sentences in every Markov chain
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    def update(self, sentences):
+        for markov_chain in self._markov_chains:
+            markov_chain.update(sentences)
+
+        self.version += 1
+
+
+    '''
+    Desc: Gets the top k next words, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the next word
+    Returns: list - Up to top_k possible next words
+    '''
+    def predict_next_words(self, words):
+        return self._get_top_k_possible_states(words)
+
+
+    '''
+    Desc: Gets the top k endings of the last (partial) word, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the partial word followed by the partial word
+    Returns: list - Up to top_k possible word endings
+    '''
+    def predict_word_endings(self, words):
+        return self._get_top_k_possible_states(words, use_prefix=True)
+
+
+    '''
+    Desc: Answers a batch of next word and word ending queries, identical queries are answered once
+    Params:
+        contexts: list - The words preceding the next word or the partial word of every query
+        partial_words: list - The partial word of every query, None for next word queries (default: None)
+    Returns: list - Up to top_k suggestions for every query
+    '''
+    def predict_batch(self, contexts, partial_words=None):
+        return predict_grouped(self, contexts, partial_words)
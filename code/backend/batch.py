@@ -0,0 +1,98 @@
+# predict_grouped keys every query while at least this fraction of the first queries of a batch repeats
+REPEAT_SAMPLE_SIZE = 1000
+MIN_REPEAT_RATE = 0.1
+
+
+'''
+Desc: Groups identical queries of a batch, only the words the model looks at decide
+      whether two queries are identical
+Params:
+    contexts: list - The words preceding the next word or the partial word of every query
+    partial_words: list - The partial word of every query, None for next word queries (default: None)
+    max_order: int - The highest order of the model
+Returns: tuple - The unique queries as pairs of a context tuple and a partial word or None,
+                 and the index of the unique query of every query in the batch
+'''
+def group_queries(contexts, partial_words, max_order):
+    if partial_words is None:
+        partial_words = [None] * len(contexts)
+    elif len(partial_words) != len(contexts):
+        raise ValueError("Expected one partial word for every context")
+
+    # queries are normalized only the first time their raw words are seen
+    query_indices = {}
+    raw_query_indices = {}
+    inverse = []
+    for context, partial_word in zip(contexts, partial_words):
+        # the partial word takes the place of the oldest context word
+        context_length = max_order if partial_word is None else max_order - 1
+        raw_query = (tuple(context[-context_length:]) if context_length > 0 else (), partial_word)
+
+        query_index = raw_query_indices.get(raw_query)
+        if query_index is None:
+            query = (
+                tuple(word.lower() for word in raw_query[0]),
+                None if partial_word is None else partial_word.lower()
+            )
+            query_index = raw_query_indices[raw_query] = query_indices.setdefault(query, len(query_indices))
+        inverse.append(query_index)
+
+    return list(query_indices), inverse
+
+
+'''
+Desc: Answers a batch of queries with the single query methods of a model, a query the batch asked
+      before is answered from the earlier answer. Keying the queries costs a fraction of a query,
+      so when the first queries barely repeat the rest are answered one by one without keys
+Params:
+    model: object - The model with predict_next_words and predict_word_endings methods
+    contexts: list - The words preceding the next word or the partial word of every query
+    partial_words: list - The partial word of every query, None for next word queries (default: None)
+Returns: list - The suggestions of every query
+'''
+def predict_grouped(model, contexts, partial_words=None):
+    if partial_words is None:
+        partial_words = [None] * len(contexts)
+    elif len(partial_words) != len(contexts):
+        raise ValueError("Expected one partial word for every context")
+
+    # the keys hold only the words the model looks at, the partial word takes the place of the oldest context word
+    next_word_length = model.max_order
+    word_ending_length = model.max_order - 1
+    predict_next_words = model.predict_next_words
+    predict_word_endings = model.predict_word_endings
+
+    # small batches are sampled too, they come one after another from the same source
+    sample_size = min(REPEAT_SAMPLE_SIZE, len(contexts) // 4)
+
+    answers = {}
+    results = []
+    for i, (context, partial_word) in enumerate(zip(contexts, partial_words)):
+        if i == sample_size and len(answers) > (1 - MIN_REPEAT_RATE) * i:
+            break
+
+        # a next word key is a tuple of words, it never equals the pair of a word ending key
+        if partial_word is None:
+            key = tuple(context[-next_word_length:])
+        else:
+            context = list(context[-word_ending_length:]) if word_ending_length > 0 else []
+            key = (tuple(context), partial_word)
+
+        suggestions = answers.get(key)
+        if suggestions is None:
+            if partial_word is None:
+                suggestions = answers[key] = predict_next_words(context)
+            else:
+                suggestions = answers[key] = predict_word_endings(context + [partial_word])
+            results.append(suggestions)
+        else:
+            results.append(list(suggestions))
+
+    for context, partial_word in zip(contexts[len(results):], partial_words[len(results):]):
+        if partial_word is None:
+            results.append(predict_next_words(context))
+        else:
+            context = list(context[-word_ending_length:]) if word_ending_length > 0 else []
+            results.append(predict_word_endings(context + [partial_word]))
+
+    return results
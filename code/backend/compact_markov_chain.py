@@ -0,0 +1,155 @@
+import numpy as np
+
+from .token_corpus import TokenCorpus
+
+
+class CompactMarkovChain:
+
+    def __init__(self, data, n, top_k=3):
+        corpus = data if isinstance(data, TokenCorpus) else TokenCorpus.from_sentences(data)
+
+        self._n = n
+        self._top_k = top_k
+        self._vocabulary = corpus.vocabulary
+        self._build_chain_of_nth_order(corpus, n)
+
+
+    '''
+    Desc: Collects every n-gram followed by a next word as rows of word IDs
+    Params:
+        corpus: TokenCorpus - The corpus to collect the n-grams from
+        n: int - The order of the Markov chain
+    Returns: numpy.ndarray - Rows of n state IDs followed by the next state ID, in corpus order
+    '''
+    def _collect_ngrams(self, corpus, n):
+        sentence_lengths = np.diff(corpus.offsets)
+        sentence_starts = np.repeat(corpus.offsets[:-1], sentence_lengths)
+        positions = np.arange(len(corpus.tokens), dtype=np.int64)
+
+        # a word can only be a next state when n words of its own sentence precede it
+        next_positions = positions[positions - sentence_starts >= n]
+        columns = [corpus.tokens[next_positions - n + i] for i in range(n + 1)]
+
+        return np.stack(columns, axis=1) if len(next_positions) else np.zeros((0, n + 1), dtype=np.int32)
+
+
+    '''
+    Desc: Builds the nth order Markov chain as CSR arrays, states are stored as sorted
+          columns of word IDs and the transitions of every state are ranked by count
+          with ties broken by first occurrence
+    Params:
+        corpus: TokenCorpus - The corpus to build the chain from
+        n: int - The order of the Markov chain
+    Returns: None
+    '''
+    def _build_chain_of_nth_order(self, corpus, n):
+        ngrams, first_occurrences, counts = np.unique(
+            self._collect_ngrams(corpus, n), axis=0, return_index=True, return_counts=True
+        )
+
+        is_new_state = np.ones(len(ngrams), dtype=bool)
+        is_new_state[1:] = np.any(ngrams[1:, :n] != ngrams[:-1, :n], axis=1)
+        state_starts = np.flatnonzero(is_new_state)
+        state_ids = np.cumsum(is_new_state) - 1
+
+        ranking = np.lexsort((first_occurrences, -counts, state_ids))
+
+        self._state_columns = np.ascontiguousarray(ngrams[state_starts, :n].T, dtype=np.int32)
+        self._offsets = np.append(state_starts, len(ngrams)).astype(np.int64)
+        self._successors = ngrams[ranking, n].astype(np.int32)
+        self._counts = counts[ranking].astype(np.int32)
+
+        if len(ngrams):
+            self._state_totals = np.add.reduceat(counts, state_starts).astype(np.int64)
+            self._state_first_occurrences = np.minimum.reduceat(first_occurrences, state_starts).astype(np.int64)
+        else:
+            self._state_totals = np.zeros(0, dtype=np.int64)
+            self._state_first_occurrences = np.zeros(0, dtype=np.int64)
+
+
+    '''
+    Desc: Finds the range of states starting with the given word IDs
+    Params:
+        word_ids: list - The leading word IDs of the states
+    Returns: tuple - The first state index and the index after the last matching state
+    '''
+    def _find_states(self, word_ids):
+        start, end = 0, self._state_columns.shape[1]
+        for column, word_id in enumerate(word_ids):
+            values = self._state_columns[column, start:end]
+            start, end = (
+                start + int(np.searchsorted(values, word_id, side='left')),
+                start + int(np.searchsorted(values, word_id, side='right'))
+            )
+            if start == end:
+                break
+
+        return start, end
+
+
+    '''
+    Desc: Gets the top k possible next words
+    Params:
+        state: tuple - The current state
+    Returns: list - Top k possible next words with their probabilities
+    '''
+    def get_words(self, state):
+        if len(state) != self._n:
+            return []
+
+        word_ids = self._vocabulary.get_ids(s.lower() for s in state)
+        if word_ids is None:
+            return []
+
+        start, end = self._find_states(word_ids)
+        if start == end:
+            return []
+
+        offset = self._offsets[start]
+        top_end = min(offset + self._top_k, self._offsets[start + 1])
+        total = self._state_totals[start]
+
+        return [
+            (self._vocabulary.get_word(successor), float(count / total))
+            for successor, count in zip(self._successors[offset:top_end], self._counts[offset:top_end])
+        ]
+
+
+    '''
+    Desc: Gets the top k possible word completions with given prefix, the words
+          that followed the context are the last column of its states
+    Params:
+        state: tuple - The current state
+    Returns: list - Top k possible word completions with their probabilities
+    '''
+    def get_words_with_prefix(self, state):
+        if len(state) != self._n:
+            return []
+
+        state_lower = [s.lower() for s in state]
+        prefix = state_lower[-1]
+        context_ids = self._vocabulary.get_ids(state_lower[:-1])
+        if context_ids is None or not prefix:
+            return []
+
+        start, end = self._find_states(context_ids)
+        word_start, word_end = self._vocabulary.prefix_range(prefix)
+        if word_start < word_end and self._vocabulary.get_word(word_start) == prefix:
+            word_start += 1
+
+        words = self._state_columns[self._n - 1, start:end]
+        start, end = (
+            start + int(np.searchsorted(words, word_start, side='left')),
+            start + int(np.searchsorted(words, word_end, side='left'))
+        )
+        if start == end:
+            return []
+
+        counts = self._state_totals[start:end]
+        ranking = np.lexsort((self._state_first_occurrences[start:end], -counts))[:self._top_k]
+        total = counts.sum()
+
+        return [
+            (self._vocabulary.get_word(self._state_columns[self._n - 1, start + i])[len(prefix):], float(counts[i] / total))
+            for i in ranking
+        ]
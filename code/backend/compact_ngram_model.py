@@ -0,0 +1,558 @@
+import heapq
+
+import numpy as np
+
+from .backoff import merge_suggestions
+from .batch import group_queries, predict_grouped
+from .context_node import ContextNode
+from ..instrumentation import timed
+
+
+class CompactNGramModel:
+
+    ARRAY_NAMES = (
+        'child_offsets',
+        'child_words',
+        'top_states',
+        'count_offsets',
+        'count_words',
+        'count_values',
+        'count_ranks',
+        'completion_offsets',
+        'completion_words',
+        'completion_counts',
+        'completion_ranks'
+    )
+
+    def __init__(self, vocabulary, arrays, max_order, top_k):
+        self.max_order = max_order
+        self.top_k = top_k
+
+        # nodes are numbered in breadth first order, the children of a node are
+        # a contiguous range of nodes sorted by the ID of the word leading to them
+        self._vocabulary = vocabulary
+        self._child_offsets = arrays['child_offsets']
+        self._child_words = arrays['child_words']
+        self._top_states = arrays['top_states']
+        self._count_offsets = arrays['count_offsets']
+        self._count_words = arrays['count_words']
+        self._count_values = arrays['count_values']
+        self._count_ranks = arrays['count_ranks']
+        self._completion_offsets = arrays['completion_offsets']
+        self._completion_words = arrays['completion_words']
+        self._completion_counts = arrays['completion_counts']
+        self._completion_ranks = arrays['completion_ranks']
+        self._child_keys = None
+        self._completion_keys = None
+
+        # the arrays are never written, so a memory-mapped model can learn too. Sentences learned later
+        # are counted in a small trie of context nodes whose top k lists rank the counts of both
+        self._learned_root = None
+        # increases whenever the model learns, cached suggestions of older versions are outdated
+        self.version = 0
+
+
+    '''
+    Desc: Gets the arrays describing the model
+    Params: None
+    Returns: dict - The arrays by their names
+    '''
+    def get_arrays(self):
+        return {name: getattr(self, '_' + name) for name in self.ARRAY_NAMES}
+
+
+    '''
+    Desc: Gets the vocabulary of the model
+    Params: None
+    Returns: Vocabulary - The vocabulary
+    '''
+    def get_vocabulary(self):
+        return self._vocabulary
+
+
+    '''
+    Desc: Gets the child node for a word
+    Params:
+        node: int - The parent node
+        word_id: int - The ID of the word leading to the child node
+    Returns: int - The child node or None if it does not exist
+    '''
+    def _get_child(self, node, word_id):
+        start, end = self._child_offsets[node], self._child_offsets[node + 1]
+        child = start + int(np.searchsorted(self._child_words[start:end], word_id))
+        if child < end and self._child_words[child] == word_id:
+            return child
+        return None
+
+
+    '''
+    Desc: Walks the trie from the most recent word of the context backwards
+    Params:
+        context: list - The context words, oldest first
+    Returns: list - Nodes for the contexts of length 1 up to the longest known context
+    '''
+    def _walk(self, context):
+        nodes = []
+        node = 0
+        for word in reversed(context):
+            word_id = self._vocabulary.get_id(word)
+            node = None if word_id is None else self._get_child(node, word_id)
+            if node is None:
+                break
+            nodes.append(node)
+
+        return nodes
+
+
+    '''
+    Desc: Walks the trie and the trie of the learned counts from the most recent word of the context backwards
+    Params:
+        context: list - The context words, oldest first
+    Returns: list - Pairs of the node and the learned node for the contexts of length 1 up to the
+                    longest context known to either of them, None where only the other one knows it
+    '''
+    def _walk_with_learned(self, context):
+        nodes = self._walk(context)
+        learned_nodes = []
+        learned_node = self._learned_root
+        if learned_node is not None:
+            for word in reversed(context):
+                learned_node = learned_node.get_child(word)
+                if learned_node is None:
+                    break
+                learned_nodes.append(learned_node)
+
+        depth = max(len(nodes), len(learned_nodes))
+        return list(zip(nodes + [None] * (depth - len(nodes)), learned_nodes + [None] * (depth - len(learned_nodes))))
+
+
+    '''
+    Desc: Gets the count of a next word of a node and the rank breaking its ties
+    Params:
+        node: int - The node or None
+        word_id: int - The ID of the next word or None
+    Returns: tuple - The count and the first seen rank of the word, 0 and None if the node has not counted it
+    '''
+    def _get_count(self, node, word_id):
+        if node is None or word_id is None:
+            return 0, None
+
+        start, end = self._count_offsets[node], self._count_offsets[node + 1]
+        position = start + int(np.searchsorted(self._count_words[start:end], word_id))
+        if position < end and self._count_words[position] == word_id:
+            return int(self._count_values[position]), int(self._count_ranks[position])
+        return 0, None
+
+
+    '''
+    Desc: Ranks the next words of a node together with the words learned after the context, only the top
+          states of the node and the learned words can rank among the top k, the count of every other
+          next word of the node did not change and it still ranks after the top states
+    Params:
+        node: int - The node or None if only the learned counts know the context
+        learned_node: ContextNode - The learned counts of the context
+    Returns: tuple - Top k next words
+    '''
+    def _rank_learned_states(self, node, learned_node):
+        ranked = {}
+        new_rank = 0
+        if node is not None:
+            for word_id in self._top_states[node].tolist():
+                if word_id >= 0:
+                    ranked[self._vocabulary.get_word(word_id)] = self._get_count(node, word_id)
+            new_rank = int(self._count_offsets[node + 1] - self._count_offsets[node])
+
+        # a word the node has not counted ranks after its words, like in the counts of NGramModel
+        for i, (word, learned_count) in enumerate(learned_node.counts.items()):
+            count, rank = ranked.get(word) or self._get_count(node, self._vocabulary.get_id(word))
+            ranked[word] = (count + learned_count, new_rank + i if rank is None else rank)
+
+        return tuple(heapq.nsmallest(self.top_k, ranked, key=lambda word: (-ranked[word][0], ranked[word][1])))
+
+
+    '''
+    Desc: Counts the words of a learned sentence in the learned nodes of all orders and ranks their top k lists
+    Params:
+        sentence: list - The tokenized sentence
+    Returns: None
+    '''
+    def _insert_learned_sentence(self, sentence):
+        for i, word in enumerate(sentence):
+            is_followed = i < len(sentence) - 1
+
+            node = 0
+            learned_node = self._learned_root
+            if is_followed:
+                learned_node.add_completion(word)
+
+            for depth in range(1, min(i, self.max_order) + 1):
+                context_word = sentence[i - depth]
+                if node is not None:
+                    word_id = self._vocabulary.get_id(context_word)
+                    node = None if word_id is None else self._get_child(node, word_id)
+
+                learned_node = learned_node.get_or_create_child(context_word)
+                learned_node.counts[word] = learned_node.counts.get(word, 0) + 1
+                learned_node.top_states = self._rank_learned_states(node, learned_node)
+
+                if is_followed and depth < self.max_order:
+                    learned_node.add_completion(word)
+
+
+    '''
+    Desc: Learns from new sentences, the predictions are the same as those of an NGramModel built
+          from the data of this model and the new sentences
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    def update(self, sentences):
+        with timed('compact_ngram_model.update'):
+            if self._learned_root is None:
+                self._learned_root = ContextNode()
+            for sentence in sentences:
+                self._insert_learned_sentence(sentence)
+
+        self.version += 1
+
+
+    '''
+    Desc: Gets the sorted keys of all nodes except the root for vectorized child lookups, the key
+          of a node combines its parent node and the ID of the word leading to it, breadth first
+          order makes the keys ascending so the key of node i + 1 is at index i
+    Params: None
+    Returns: np.ndarray - The keys of the nodes
+    '''
+    def _get_child_keys(self):
+        if self._child_keys is None:
+            node_count = len(self._child_offsets) - 1
+            parents = np.repeat(np.arange(node_count, dtype=np.int64), np.diff(self._child_offsets))
+            self._child_keys = parents * len(self._vocabulary) + self._child_words[1:]
+
+        return self._child_keys
+
+
+    '''
+    Desc: Gets the sorted keys of all completions for vectorized range lookups, the key of a completion
+          combines its node and the ID of the completed word, the completions of a node are sorted by
+          word ID and the nodes follow each other so the keys are ascending
+    Params: None
+    Returns: np.ndarray - The keys of the completions
+    '''
+    def _get_completion_keys(self):
+        if self._completion_keys is None:
+            node_count = len(self._completion_offsets) - 1
+            nodes = np.repeat(np.arange(node_count, dtype=np.int64), np.diff(self._completion_offsets))
+            self._completion_keys = nodes * len(self._vocabulary) + self._completion_words
+
+        return self._completion_keys
+
+
+    '''
+    Desc: Walks the trie for many contexts at once, one context word per step for all contexts
+    Params:
+        context_ids: np.ndarray - The word IDs of every context, the most recent word first,
+                                  unknown words and missing words are -1
+    Returns: np.ndarray - The node of every context length for every context, -1 where the context is not known
+    '''
+    def _walk_batch(self, context_ids):
+        child_keys = self._get_child_keys()
+        nodes = np.full(context_ids.shape, -1, dtype=np.int64)
+        if len(child_keys) == 0:
+            return nodes
+
+        node = np.zeros(len(context_ids), dtype=np.int64)
+        found = np.ones(len(context_ids), dtype=bool)
+        for depth in range(context_ids.shape[1]):
+            word_ids = context_ids[:, depth]
+            keys = node * len(self._vocabulary) + word_ids
+            positions = np.minimum(np.searchsorted(child_keys, keys), len(child_keys) - 1)
+
+            found &= (word_ids >= 0) & (child_keys[positions] == keys)
+            node = np.where(found, positions + 1, node)
+            nodes[:, depth] = np.where(found, node, -1)
+
+        return nodes
+
+
+    '''
+    Desc: Looks up the word IDs of many contexts at once
+    Params:
+        contexts: list - The context words of every query, oldest first
+    Returns: np.ndarray - The word IDs of every context, the most recent word first,
+                          unknown words and missing words are -1
+    '''
+    def _get_context_ids(self, contexts):
+        word_ids = {}
+        for word in {word for context in contexts for word in context}:
+            word_id = self._vocabulary.get_id(word)
+            word_ids[word] = -1 if word_id is None else word_id
+
+        lengths = np.array([len(context) for context in contexts], dtype=np.int64)
+        flat_ids = np.array([word_ids[word] for context in contexts for word in reversed(context)], dtype=np.int64)
+        rows = np.repeat(np.arange(len(contexts)), lengths)
+        depths = np.arange(len(flat_ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        context_ids = np.full((len(contexts), self.max_order), -1, dtype=np.int64)
+        context_ids[rows, depths] = flat_ids
+        return context_ids
+
+
+    '''
+    Desc: Merges the top states of several nodes for many queries at once, the same as
+          merge_suggestions does for a single query
+    Params:
+        nodes: np.ndarray - The nodes of every query in backoff order, -1 for missing nodes
+    Returns: np.ndarray - The top k state IDs of every query, -1 where there are fewer states
+    '''
+    def _merge_top_states(self, nodes):
+        return self._merge_states(np.where((nodes >= 0)[:, :, None], self._top_states[nodes], -1).reshape(len(nodes), -1))
+
+
+    '''
+    Desc: Merges ranked word IDs of several nodes for many queries at once, the same as
+          merge_suggestions does for a single query
+    Params:
+        states: np.ndarray - The ranked word IDs of the nodes of every query in backoff order, -1 for missing ones
+    Returns: np.ndarray - The top k word IDs of every query, -1 where there are fewer words
+    '''
+    def _merge_states(self, states):
+        # keep the first occurrence of every state, then move the kept states to the front in order
+        duplicates = np.tril(states[:, :, None] == states[:, None, :], -1).any(axis=2)
+        kept = (states >= 0) & ~duplicates
+        order = np.argsort(~kept, axis=1, kind='stable')[:, :self.top_k]
+        return np.where(np.take_along_axis(kept, order, axis=1), np.take_along_axis(states, order, axis=1), -1)
+
+
+    '''
+    Desc: Ranks the completions of a node within a range of word IDs
+    Params:
+        node: int - The node holding the context of the partial word
+        word_range: tuple - The range of word IDs starting with the partial word
+    Returns: list - The positions of the top k completions in the completion arrays
+    '''
+    def _rank_completions(self, node, word_range):
+        start, end = self._completion_offsets[node], self._completion_offsets[node + 1]
+        words = self._completion_words[start:end]
+        start, end = (
+            start + int(np.searchsorted(words, word_range[0], side='left')),
+            start + int(np.searchsorted(words, word_range[1], side='left'))
+        )
+
+        ranking = np.lexsort((self._completion_ranks[start:end], -self._completion_counts[start:end]))
+        return [start + i for i in ranking[:self.top_k].tolist()]
+
+
+    '''
+    Desc: Ranks the completions of many nodes at once, like _rank_completions does for a single node
+    Params:
+        nodes: np.ndarray - The nodes of every query in backoff order, -1 for missing nodes
+        word_ranges: np.ndarray - The range of word IDs starting with the partial word of every query
+    Returns: np.ndarray - The top k completed word IDs of the nodes of every query in backoff order,
+                          -1 where there are fewer completions
+    '''
+    def _rank_completions_batch(self, nodes, word_ranges):
+        completion_keys = self._get_completion_keys()
+        found = nodes >= 0
+        node_ids = nodes[found]
+        ranges = np.broadcast_to(word_ranges[:, None, :], nodes.shape + (2,))[found]
+        starts = np.searchsorted(completion_keys, node_ids * len(self._vocabulary) + ranges[:, 0])
+        ends = np.searchsorted(completion_keys, node_ids * len(self._vocabulary) + ranges[:, 1])
+
+        # the root and the other short contexts are asked for the same partial words again and again
+        segment_keys, segment_indices = np.unique(starts * (len(completion_keys) + 1) + ends, return_inverse=True)
+        segment_starts, segment_ends = np.divmod(segment_keys, len(completion_keys) + 1)
+
+        # rank all completions of every segment at once, sorted by segment, count and first seen rank
+        lengths = segment_ends - segment_starts
+        segment_ids = np.repeat(np.arange(len(segment_keys)), lengths)
+        offsets = np.arange(len(segment_ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(segment_starts, lengths) + offsets
+        positions = positions[np.lexsort((self._completion_ranks[positions], -self._completion_counts[positions], segment_ids))]
+
+        kept = offsets < self.top_k
+        top_completions = np.full((len(segment_keys), self.top_k), -1, dtype=np.int64)
+        top_completions[segment_ids[kept], offsets[kept]] = self._completion_words[positions[kept]]
+
+        states = np.full(nodes.shape + (self.top_k,), -1, dtype=np.int64)
+        states[found] = top_completions[segment_indices.reshape(-1)]
+        return states.reshape(len(nodes), -1)
+
+
+    '''
+    Desc: Gets the range of word IDs completing a partial word, the partial word itself is not a completion
+    Params:
+        prefix: str - The partial word
+    Returns: tuple - The first ID and the ID after the last completing word
+    '''
+    def _get_word_range(self, prefix):
+        word_start, word_end = self._vocabulary.prefix_range(prefix)
+        if word_start < word_end and self._vocabulary.get_word(word_start) == prefix:
+            word_start += 1
+        return word_start, word_end
+
+
+    '''
+    Desc: Gets the top k endings of a partial word stored in a node
+    Params:
+        node: int - The node holding the context of the partial word
+        prefix: str - The partial word
+        word_range: tuple - The range of word IDs starting with the partial word
+    Returns: list - Up to top_k word endings
+    '''
+    def _get_completions(self, node, prefix, word_range):
+        return [
+            self._vocabulary.get_word(self._completion_words[position])[len(prefix):]
+            for position in self._rank_completions(node, word_range)
+        ]
+
+
+    '''
+    Desc: Gets the count of a completion of a node and the rank breaking its ties
+    Params:
+        node: int - The node or None
+        word_id: int - The ID of the completed word or None
+    Returns: tuple - The count and the first seen rank of the word, 0 and None if the node does not store it
+    '''
+    def _get_completion_count(self, node, word_id):
+        if node is None or word_id is None:
+            return 0, None
+
+        start, end = self._completion_offsets[node], self._completion_offsets[node + 1]
+        position = start + int(np.searchsorted(self._completion_words[start:end], word_id))
+        if position < end and self._completion_words[position] == word_id:
+            return int(self._completion_counts[position]), int(self._completion_ranks[position])
+        return 0, None
+
+
+    '''
+    Desc: Gets the top k endings of a partial word from the completions of a node and the completions
+          learned after its context, like _rank_learned_states only the top k completions of the node
+          and the learned completions can rank among the top k
+    Params:
+        node: int - The node holding the context of the partial word or None
+        completions: WordCompletions - The learned completions of the context or None
+        prefix: str - The partial word
+        word_range: tuple - The range of word IDs starting with the partial word
+    Returns: list - Up to top_k word endings
+    '''
+    def _get_learned_completions(self, node, completions, prefix, word_range):
+        ranked = {}
+        new_rank = 0
+        if node is not None:
+            for position in self._rank_completions(node, word_range):
+                word = self._vocabulary.get_word(self._completion_words[position])
+                ranked[word] = (int(self._completion_counts[position]), int(self._completion_ranks[position]))
+            new_rank = int(self._completion_offsets[node + 1] - self._completion_offsets[node])
+
+        for word, learned_count, learned_rank in completions.get_entries() if completions is not None else ():
+            if len(word) <= len(prefix) or not word.startswith(prefix):
+                continue
+            count, rank = ranked.get(word) or self._get_completion_count(node, self._vocabulary.get_id(word))
+            ranked[word] = (count + learned_count, new_rank + learned_rank if rank is None else rank)
+
+        return [
+            word[len(prefix):]
+            for word in heapq.nsmallest(self.top_k, ranked, key=lambda word: (-ranked[word][0], ranked[word][1]))
+        ]
+
+
+    '''
+    Desc: Gets the top k next words, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the next word
+    Returns: list - Up to top_k possible next words
+    '''
+    def predict_next_words(self, words):
+        context = [word.lower() for word in words[-self.max_order:]]
+        nodes = self._walk_with_learned(context)
+
+        return merge_suggestions((
+            [self._vocabulary.get_word(word_id) for word_id in self._top_states[node] if word_id >= 0]
+            if learned_node is None else learned_node.top_states
+            for node, learned_node in reversed(nodes)
+        ), self.top_k)
+
+
+    '''
+    Desc: Gets the top k endings of the last (partial) word, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the partial word followed by the partial word
+    Returns: list - Up to top_k possible word endings
+    '''
+    def predict_word_endings(self, words):
+        if not words:
+            return []
+
+        state = [word.lower() for word in words[-self.max_order:]]
+        prefix = state[-1]
+        if not prefix:
+            return []
+
+        word_range = self._get_word_range(prefix)
+        nodes = [(0, self._learned_root)] + self._walk_with_learned(state[:-1])
+        return merge_suggestions((
+            self._get_completions(node, prefix, word_range) if learned_node is None
+            else self._get_learned_completions(node, learned_node.completions, prefix, word_range)
+            for node, learned_node in reversed(nodes)
+        ), self.top_k)
+
+
+    '''
+    Desc: Looks up the words of the word IDs of many queries
+    Params:
+        word_ids: np.ndarray - The word IDs of every query, -1 where there are fewer words
+    Returns: list - The words of every query
+    '''
+    def _get_words(self, word_ids):
+        unique_ids, indices = np.unique(word_ids, return_inverse=True)
+        words = np.array([self._vocabulary.get_word(word_id) if word_id >= 0 else None for word_id in unique_ids.tolist()], dtype=object)
+        return [
+            [word for word in row_words if word is not None] if None in row_words else row_words
+            for row_words in words[indices.reshape(word_ids.shape)].tolist()
+        ]
+
+
+    '''
+    Desc: Answers a batch of next word and word ending queries, identical queries are answered once,
+          the trie is walked and the top states and completions are ranked for all of them together
+    Params:
+        contexts: list - The words preceding the next word or the partial word of every query
+        partial_words: list - The partial word of every query, None for next word queries (default: None)
+    Returns: list - Up to top_k suggestions for every query
+    '''
+    def predict_batch(self, contexts, partial_words=None):
+        if self._learned_root is not None:
+            # the vectorized lookups only read the arrays, the learned counts are ranked query by query
+            return predict_grouped(self, contexts, partial_words)
+
+        queries, inverse = group_queries(contexts, partial_words, self.max_order)
+
+        context_ids = self._get_context_ids([context for context, _ in queries])
+        nodes = self._walk_batch(context_ids)
+        results = [None] * len(queries)
+
+        # next words: the top states of the found nodes, the longest context first
+        rows = np.array([row for row, (_, partial_word) in enumerate(queries) if partial_word is None], dtype=np.int64)
+        if len(rows):
+            top_states = self._merge_top_states(nodes[rows, ::-1])
+            for row, row_words in zip(rows.tolist(), self._get_words(top_states)):
+                results[row] = row_words
+
+        # word endings: the completions of the found nodes, the longest context first, and of the root
+        rows = [row for row, (_, partial_word) in enumerate(queries) if partial_word]
+        if rows:
+            prefixes = [queries[row][1] for row in rows]
+            word_ranges = {prefix: self._get_word_range(prefix) for prefix in set(prefixes)}
+
+            row_nodes = np.concatenate([nodes[rows, ::-1], np.zeros((len(rows), 1), dtype=np.int64)], axis=1)
+            states = self._rank_completions_batch(row_nodes, np.array([word_ranges[prefix] for prefix in prefixes], dtype=np.int64))
+            for row, prefix, row_words in zip(rows, prefixes, self._get_words(self._merge_states(states))):
+                results[row] = [word[len(prefix):] for word in row_words]
+
+        # the partial word of a word ending query is empty, it is not completed
+        for row, (_, partial_word) in enumerate(queries):
+            if partial_word == '':
+                results[row] = []
+
+        return [list(results[query_index]) for query_index in inverse]
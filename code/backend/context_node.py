@@ -0,0 +1,52 @@
+from .prefix_index import WordCompletions
+
+
+class ContextNode:
+
+    __slots__ = ('children', 'counts', 'completions', 'top_states')
+
+    def __init__(self):
+        self.children = None
+        self.counts = {}
+        self.completions = None
+        self.top_states = ()
+
+
+    '''
+    Desc: Gets the child node for a word, creating it if it does not exist
+    Params:
+        word: str - The word leading to the child node
+    Returns: ContextNode - The child node
+    '''
+    def get_or_create_child(self, word):
+        if self.children is None:
+            self.children = {}
+
+        child = self.children.get(word)
+        if child is None:
+            child = self.children[word] = ContextNode()
+        return child
+
+
+    '''
+    Desc: Gets the child node for a word
+    Params:
+        word: str - The word leading to the child node
+    Returns: ContextNode - The child node or None if it does not exist
+    '''
+    def get_child(self, word):
+        if self.children is None:
+            return None
+        return self.children.get(word)
+
+
+    '''
+    Desc: Adds a word that followed the context of this node and was not the last word of its sentence
+    Params:
+        word: str - The word to add
+    Returns: None
+    '''
+    def add_completion(self, word):
+        if self.completions is None:
+            self.completions = WordCompletions()
+        self.completions.add(word)
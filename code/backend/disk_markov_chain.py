@@ -0,0 +1,140 @@
+import os
+import itertools
+import pathlib
+import sqlite3
+
+from .markov_chain import count_transitions
+from ..instrumentation import timed
+
+
+class DiskMarkovChain:
+
+    def __init__(self, file_path, cache_size_mb=64):
+        # the chain stays on disk, only the pages of the recently used states are kept
+        # in the cache of SQLite, the rest is read through the page cache of the system
+        uri = pathlib.Path(file_path).absolute().as_uri() + '?mode=ro'
+        self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._connection.execute(f'PRAGMA cache_size = {-int(cache_size_mb * 1024)}')
+
+        meta = dict(self._connection.execute('SELECT key, value FROM meta'))
+        self._n = int(meta['n'])
+        self._top_k = int(meta['top_k'])
+
+
+    '''
+    Desc: Builds the nth order Markov chain into an SQLite file without keeping the whole chain in
+          memory, the sentences are counted in chunks that are added to the counts on disk. States
+          are ranked like in MarkovChain, ties keep the order in which the states were first counted
+    Params:
+        data: iterable - The tokenized sentences, can be a generator
+        n: int - The order of the Markov chain
+        file_path: str - Path to the file to build, an existing file is replaced
+        top_k: int - The number of next words kept for every state (default: 3)
+        chunk_size: int - The number of sentences counted in memory at once (default: 20000)
+    Returns: DiskMarkovChain - The built chain opened for reading
+    '''
+    @classmethod
+    def build(cls, data, n, file_path, top_k=3, chunk_size=20000):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+        connection = sqlite3.connect(file_path)
+        try:
+            connection.executescript('''
+                PRAGMA journal_mode = OFF;
+                PRAGMA synchronous = OFF;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE transitions (state TEXT, word TEXT, count INTEGER, PRIMARY KEY (state, word));
+                CREATE TABLE states (state TEXT PRIMARY KEY, context TEXT, word TEXT, total INTEGER);
+            ''')
+
+            # rowids are assigned when a row is first inserted, so they keep the first seen order
+            with timed('disk_markov_chain.count'):
+                sentences = iter(data)
+                for chunk in iter(lambda: list(itertools.islice(sentences, chunk_size)), []):
+                    chain, totals = count_transitions(chunk, n)
+                    connection.executemany(
+                        'INSERT INTO transitions VALUES (?, ?, ?) '
+                        'ON CONFLICT (state, word) DO UPDATE SET count = count + excluded.count',
+                        (
+                            (' '.join(state), word, count)
+                            for state, transition_states in chain.items()
+                            for word, count in transition_states.items()
+                        )
+                    )
+                    connection.executemany(
+                        'INSERT INTO states VALUES (?, ?, ?, ?) '
+                        'ON CONFLICT (state) DO UPDATE SET total = total + excluded.total',
+                        ((' '.join(state), ' '.join(state[:n-1]), state[-1], total) for state, total in totals.items())
+                    )
+
+            with timed('disk_markov_chain.rank_top_states'):
+                connection.executescript(f'''
+                    CREATE TABLE top_states (
+                        state TEXT, rank INTEGER, word TEXT, probability REAL, PRIMARY KEY (state, rank)
+                    ) WITHOUT ROWID;
+                    INSERT INTO top_states
+                    SELECT ranked.state, ranked.rank, ranked.word, CAST(ranked.count AS REAL) / states.total
+                    FROM (
+                        SELECT state, word, count,
+                            ROW_NUMBER() OVER (PARTITION BY state ORDER BY count DESC, rowid) AS rank
+                        FROM transitions
+                    ) AS ranked JOIN states ON states.state = ranked.state
+                    WHERE ranked.rank <= {int(top_k)};
+                    DROP TABLE transitions;
+                    CREATE INDEX states_by_context ON states (context, word, total);
+                ''')
+
+            connection.executemany('INSERT INTO meta VALUES (?, ?)', [('n', str(n)), ('top_k', str(top_k))])
+            connection.commit()
+            connection.execute('VACUUM')
+        finally:
+            connection.close()
+
+        return cls(file_path)
+
+
+    '''
+    Desc: Gets the top k possible next words
+    Params:
+        state: tuple - The current state
+    Returns: list - Top k possible next words with their probabilities
+    '''
+    def get_words(self, state):
+        state_lower = ' '.join(s.lower() for s in state)
+        return self._connection.execute(
+            'SELECT word, probability FROM top_states WHERE state = ? ORDER BY rank', (state_lower,)
+        ).fetchall()
+
+
+    '''
+    Desc: Gets the top k possible word completions with given prefix, ties are broken by the
+          order in which the words were first counted
+    Params:
+        state: tuple - The current state
+    Returns: list - Top k possible word completions with their probabilities
+    '''
+    def get_words_with_prefix(self, state):
+        if not state or not state[-1]:
+            return []
+
+        context = ' '.join(s.lower() for s in state[:-1])
+        prefix = state[-1].lower()
+
+        # words longer than the prefix that start with it sort between the prefix and the prefix followed by the highest character
+        completions = self._connection.execute(
+            'SELECT word, total, SUM(total) OVER () FROM states '
+            'WHERE context = ? AND word > ? AND word < ? ORDER BY total DESC, rowid LIMIT ?',
+            (context, prefix, prefix + chr(0x10FFFF), self._top_k)
+        ).fetchall()
+
+        return [(word[len(prefix):], total / total_count) for word, total, total_count in completions]
+
+
+    '''
+    Desc: Closes the file of the chain
+    Params: None
+    Returns: None
+    '''
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,209 @@
+import time
+from collections import Counter
+import numpy as np
+
+from .process_pool import create_process_pool
+
+
+# the evaluator of a worker process, set once when the process starts
+_worker_evaluator = None
+
+
+'''
+Desc: Sets the evaluator of a worker process, the models are passed once per process instead of once per chunk
+Params:
+    models: dict - The models to evaluate by name
+    top_k: int - The number of suggestions shown to the user
+Returns: None
+'''
+def _initialize_worker(models, top_k):
+    global _worker_evaluator
+    _worker_evaluator = Evaluator(models, top_k)
+
+
+'''
+Desc: Replays a chunk of sentences with the evaluator of the worker process
+Params:
+    sentences: list - The tokenized sentences
+Returns: dict - The counts and latencies of every model
+'''
+def _evaluate_chunk(sentences):
+    return _worker_evaluator.evaluate_sentences(sentences)
+
+
+'''
+Desc: Summarizes query latencies
+Params:
+    latencies_ns: numpy.ndarray - The latency of every query in nanoseconds
+Returns: dict - Count, mean, p50 and p99 latency in microseconds
+'''
+def summarize_latencies(latencies_ns):
+    if not len(latencies_ns):
+        return {'count': 0, 'mean_us': None, 'p50_us': None, 'p99_us': None}
+
+    latencies_us = latencies_ns.astype(np.float64) / 1000
+    return {
+        'count': len(latencies_us),
+        'mean_us': round(float(latencies_us.mean()), 3),
+        'p50_us': round(float(np.percentile(latencies_us, 50)), 3),
+        'p99_us': round(float(np.percentile(latencies_us, 99)), 3)
+    }
+
+
+
+class Evaluator:
+
+    def __init__(self, models, top_k=3):
+        # every model answers like the editor asks, e.g. the Markov chain backoff of each order,
+        # top_k is the number of suggestion buttons
+        self._models = models
+        self._top_k = top_k
+
+
+    '''
+    Desc: Asks a model for suggestions and measures the latency of the query
+    Params:
+        predict: callable - The prediction method of the model
+        words: list - The words of the query
+        latencies: list - The latencies of the queries, the latency of this query is appended
+    Returns: list - Up to top_k suggestions
+    '''
+    def _query(self, predict, words, latencies):
+        start = time.perf_counter_ns()
+        suggestions = predict(words)
+        latencies.append(time.perf_counter_ns() - start)
+        return suggestions[:self._top_k]
+
+
+    '''
+    Desc: Counts whether the expected suggestion is the first or one of the shown suggestions
+    Params:
+        suggestions: list - The shown suggestions
+        expected: str - The word or word ending the user types
+        counts: Counter - The counts of the model
+        kind: str - The kind of the query, next_word or word_ending
+    Returns: bool - Whether the expected suggestion is shown
+    '''
+    def _count_hit(self, suggestions, expected, counts, kind):
+        counts[f'{kind}_queries'] += 1
+        if expected not in suggestions:
+            return False
+
+        counts[f'{kind}_top_k'] += 1
+        if suggestions[0] == expected:
+            counts[f'{kind}_top_1'] += 1
+        return True
+
+
+    '''
+    Desc: Replays typing a word like the editor, the next words are suggested after the previous word,
+          then the ending is suggested after every typed letter until the word is shown. A shown word is
+          accepted with one keystroke, the first ending with Tab and the others with their buttons
+    Params:
+        model: object - The model with predict_next_words and predict_word_endings methods
+        previous_words: list - The words of the sentence before the word
+        word: str - The word to type
+        counts: Counter - The counts of the model
+        latencies: dict - The latencies of both kinds of queries
+    Returns: int - The number of keystrokes needed to type the word
+    '''
+    def _replay_word(self, model, previous_words, word, counts, latencies):
+        # the editor asks with the last max_order words before the cursor, a partial word is one of them
+        if previous_words:
+            context = previous_words[-model.max_order:]
+            suggestions = self._query(model.predict_next_words, context, latencies['next_word'])
+            if self._count_hit(suggestions, word, counts, 'next_word'):
+                return 1
+
+        context = previous_words[-(model.max_order - 1):] if model.max_order > 1 else []
+        for typed in range(1, len(word)):
+            suggestions = self._query(model.predict_word_endings, context + [word[:typed]], latencies['word_ending'])
+            if self._count_hit(suggestions, word[typed:], counts, 'word_ending'):
+                return typed + 1
+
+        return len(word)
+
+
+    '''
+    Desc: Replays typing the sentences with every model, a space is typed after every word
+    Params:
+        sentences: list - The tokenized sentences
+    Returns: dict - The counts and latencies of every model
+    '''
+    def evaluate_sentences(self, sentences):
+        results = {}
+        for name, model in self._models.items():
+            counts = Counter()
+            latencies = {'next_word': [], 'word_ending': []}
+
+            for sentence in sentences:
+                for i, word in enumerate(sentence):
+                    counts['words'] += 1
+                    counts['keystrokes'] += len(word) + 1
+
+                    keystrokes = self._replay_word(model, sentence[:i], word, counts, latencies)
+                    counts['typed_keystrokes'] += keystrokes + 1
+                    if keystrokes < len(word):
+                        counts['completed_words'] += 1
+
+            results[name] = (counts, {kind: np.array(values, dtype=np.int64) for kind, values in latencies.items()})
+
+        return results
+
+
+    '''
+    Desc: Replays typing the held out sentences with every model, the sentences are split into chunks
+          replayed in a process pool whose workers receive the models once when they start. Latencies are
+          measured inside the workers, so they include the contention of the workers running on the same machine
+    Params:
+        sentences: iterable - The held out tokenized sentences
+        workers: int - Number of worker processes, 1 replays in the current process (default: 1)
+        chunk_size: int - Number of sentences replayed by a worker at once (default: 500)
+    Returns: dict - Hit rates, keystroke savings and latencies of every model
+    '''
+    def evaluate(self, sentences, workers=1, chunk_size=500):
+        sentences = list(sentences)
+        chunks = [sentences[i:i + chunk_size] for i in range(0, len(sentences), chunk_size)]
+
+        if workers > 1:
+            with create_process_pool(workers, _initialize_worker, (self._models, self._top_k)) as executor:
+                chunk_results = list(executor.map(_evaluate_chunk, chunks))
+        else:
+            chunk_results = [self.evaluate_sentences(chunk) for chunk in chunks]
+
+        return {
+            str(name): self._summarize([chunk_result[name] for chunk_result in chunk_results])
+            for name in self._models
+        }
+
+
+    '''
+    Desc: Merges the results of all chunks of a model into its summary
+    Params:
+        results: list - The counts and latencies of every chunk
+    Returns: dict - Hit rates, keystroke savings and latencies
+    '''
+    def _summarize(self, results):
+        counts = Counter()
+        for chunk_counts, _ in results:
+            counts.update(chunk_counts)
+
+        summary = {
+            'words': counts['words'],
+            'keystrokes': counts['keystrokes'],
+            'typed_keystrokes': counts['typed_keystrokes'],
+            'keystroke_savings': round(1 - counts['typed_keystrokes'] / counts['keystrokes'], 4) if counts['keystrokes'] else None,
+            'completed_words': round(counts['completed_words'] / counts['words'], 4) if counts['words'] else None
+        }
+
+        for kind in ('next_word', 'word_ending'):
+            queries = counts[f'{kind}_queries']
+            latencies = np.concatenate([chunk_latencies[kind] for _, chunk_latencies in results] or [np.zeros(0, dtype=np.int64)])
+            summary[kind] = {
+                'queries': queries,
+                'top_1_hit_rate': round(counts[f'{kind}_top_1'] / queries, 4) if queries else None,
+                f'top_{self._top_k}_hit_rate': round(counts[f'{kind}_top_k'] / queries, 4) if queries else None,
+                'latency': summarize_latencies(latencies)
+            }
+
+        return summary
@@ -0,0 +1,29 @@
+import json
+import os
+
+
+'''
+Desc: Appends sentences the model learned from typing to a file, one JSON list of words per line
+Params:
+    file_path: str - Path to the file
+    sentences: list - The tokenized sentences
+Returns: None
+'''
+def append_learned_sentences(file_path, sentences):
+    with open(file_path, 'a', encoding='utf-8') as file:
+        for sentence in sentences:
+            file.write(json.dumps(sentence) + '\n')
+
+
+'''
+Desc: Loads the sentences the model learned from typing in earlier sessions
+Params:
+    file_path: str - Path to the file
+Returns: list - The tokenized sentences, empty if the file does not exist
+'''
+def load_learned_sentences(file_path):
+    if not os.path.exists(file_path):
+        return []
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
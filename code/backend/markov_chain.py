@@ -1,12 +1,83 @@
-import operator
+import itertools
+from collections import deque
+import numpy as np
+
+from .prefix_index import PrefixIndex
+from .process_pool import create_process_pool
+from .ranking import rank_top_states, update_top_states
+from .sharding import get_shard
+from ..instrumentation import timed
+
+
+'''
+Desc: Counts the state transitions of sentences into partial tables that can be merged,
+      the tables are in first seen order like the tables of a serial build
+Params:
+    sentences: list - The tokenized sentences
+    n: int - The order of the Markov chain
+    shard: tuple - The shard index and the shard count, None counts every state (default: None)
+Returns: tuple - The transition counts of every state and the total count of every state
+'''
+def count_transitions(sentences, n, shard=None):
+    chain = {}
+    totals = {}
+    for sentence in sentences:
+        for i in range(len(sentence) - n):
+            current_state = tuple(sentence[i:i+n])
+            if shard is not None and get_shard(current_state[:n-1], shard[1]) != shard[0]:
+                continue
+
+            transition_states = chain.get(current_state)
+            if transition_states is None:
+                transition_states = chain[current_state] = {}
+            next_state = sentence[i+n]
+            transition_states[next_state] = transition_states.get(next_state, 0) + 1
+            totals[current_state] = totals.get(current_state, 0) + 1
+
+    return chain, totals
+
+
 
 class MarkovChain:
 
-    def __init__(self, data, n):
+    # number of sentences counted by a worker process at once
+    PARALLEL_CHUNK_SIZE = 20000
+
+    def __init__(self, data, n, top_k=3, keep_distributions=True, min_count=1, max_fanout=None, max_transitions=None, shard=None, workers=1):
+        self._n = n
         self._chain = {}
-        self._prefix_chain = {}
+        self._totals = {}
+        self._prefix_index = PrefixIndex()
+        self._top_k = top_k
+        self._top_states = {}
+        self._keep_distributions = keep_distributions
+
+        # memory budget: transitions rarer than min_count and beyond the max_fanout most frequent
+        # ones of a state are dropped after the build, max_transitions bounds the stored
+        # transitions already while counting
+        self._min_count = min_count
+        self._max_fanout = max_fanout
+        self._max_transitions = max_transitions
+        self._transition_count = 0
+        self._is_pruned = min_count > 1 or max_fanout is not None or max_transitions is not None
+
+        # a shard given as (shard index, shard count) keeps only the states whose context, the
+        # first n-1 words, hashes to the shard, next word and prefix queries of a context
+        # are therefore answered by the same shard
+        self._shard = shard
+
+        # with several workers the sentences are counted in a process pool and the partial
+        # counts are merged in the order of the sentences, the result is the serial build
+        if workers > 1 and max_transitions is not None:
+            raise ValueError("max_transitions prunes while counting and cannot be used with several workers")
+        self._workers = workers
+
         self._build_chain_of_nth_order(data, n)
 
+        # only the counts of the ranked top k states are needed to answer next word queries
+        if not keep_distributions:
+            self._chain = self._get_top_distributions()
+
 
     '''
     Desc: Inserts a state transition into the chain
@@ -14,7 +85,7 @@ class MarkovChain:
         chain: dict - The chain to insert into
         current_state: tuple - The current state
         next_state: str - The next state
-    Returns: None
+    Returns: bool - True if the transition was not in the chain yet
     '''
     def _insert_into_chain(self, chain, current_state, next_state):
             if current_state not in chain:
@@ -22,26 +93,149 @@ class MarkovChain:
             elif next_state not in chain[current_state]:
                 chain[current_state][next_state] = 1
             else:
-                chain[current_state][next_state] += 1        
+                chain[current_state][next_state] += 1
+                return False
+
+            return True
 
 
     '''
-    Desc: Builds the prefix chain for word completion
+    Desc: Inserts all state transitions of a sentence into the chain and the prefix index
     Params:
-        words: list - The list of words to build the prefix chain from
-        n: int - The order of the Markov chain
+        sentence: list - The tokenized sentence
+        index_prefixes: bool - Whether to insert the states into the prefix index (default: True)
+    Returns: list - The inserted transitions as pairs of current state and next state
+    '''
+    def _insert_sentence(self, sentence, index_prefixes=True):
+        n = self._n
+        transitions = []
+        if len(sentence) == 0 or len(sentence) < n: return transitions
+
+        for i in range(len(sentence) - n):
+            current_state = tuple(sentence[i:i+n])
+            if self._shard is not None and get_shard(current_state[:n-1], self._shard[1]) != self._shard[0]:
+                continue
+
+            next_state = sentence[i+n]
+            self._transition_count += self._insert_into_chain(self._chain, current_state, next_state)
+            self._totals[current_state] = self._totals.get(current_state, 0) + 1
+
+            if index_prefixes:
+                self._prefix_index.insert(current_state[:n-1], current_state[-1])
+            transitions.append((current_state, next_state))
+
+        return transitions
+
+
+    '''
+    Desc: Checks if more transitions are stored than the budget allows
+    Params: None
+    Returns: bool - True if the transitions have to be pruned
+    '''
+    def _exceeds_budget(self):
+        return self._max_transitions is not None and self._transition_count > self._max_transitions
+
+
+    '''
+    Desc: Prunes the transitions like the Misra-Gries heavy hitters algorithm, every count is
+          decreased by the same amount so that at least half of the budget becomes free again.
+          Counts stay in the same order, a count is lower than the true count by at most
+          the sum of all decreases, transitions more frequent than that are never dropped
+    Params: None
     Returns: None
     '''
-    def _build_prefix_chain(self, words, n):
-        last_word = words[-1]
-        for i in range(1,len(last_word)):
-        
-            q = words[:n-1]
-            q.append(last_word[:i])
-            prefix_state = tuple(q)
-            next_state = last_word[i:]
+    def _prune_heavy_hitters(self):
+        counts = np.fromiter(
+            (count for transitions in self._chain.values() for count in transitions.values()),
+            dtype=np.int64, count=self._transition_count
+        )
+        removed_count = self._transition_count - self._max_transitions // 2
+        decrease = int(np.partition(counts, removed_count - 1)[removed_count - 1])
+
+        self._prune(lambda count: count - decrease)
+
+
+    '''
+    Desc: Drops the transitions below the minimal count and beyond the maximal fanout of every state
+    Params: None
+    Returns: None
+    '''
+    def _prune_rare_transitions(self):
+        if self._min_count > 1:
+            self._prune(lambda count: count if count >= self._min_count else 0)
+
+        if self._max_fanout is not None:
+            for current_state, transition_states in self._chain.items():
+                if len(transition_states) > self._max_fanout:
+                    kept_states = set(rank_top_states(transition_states, self._max_fanout))
+                    self._chain[current_state] = {
+                        state: count for state, count in transition_states.items() if state in kept_states
+                    }
+            self._transition_count = sum(len(transition_states) for transition_states in self._chain.values())
+
+
+    '''
+    Desc: Drops the transitions below the minimal count and beyond the maximal fanout of some states
+          like _prune_rare_transitions does for every state, states without transitions are removed
+    Params:
+        states: iterable - The states to prune
+    Returns: None
+    '''
+    def _prune_rare_transitions_of(self, states):
+        for current_state in states:
+            transition_states = self._chain.get(current_state)
+            if transition_states is None:
+                continue
+
+            kept_states = {state: count for state, count in transition_states.items() if count >= self._min_count}
+            if self._max_fanout is not None and len(kept_states) > self._max_fanout:
+                top_states = set(rank_top_states(kept_states, self._max_fanout))
+                kept_states = {state: count for state, count in kept_states.items() if state in top_states}
+
+            self._transition_count += len(kept_states) - len(transition_states)
+            if kept_states:
+                self._chain[current_state] = kept_states
+            else:
+                del self._chain[current_state]
+                del self._totals[current_state]
+
+
+    '''
+    Desc: Replaces every transition count, transitions whose count drops to zero are removed
+          and so are states without transitions
+    Params:
+        new_count: callable - Maps a count to the new count
+    Returns: None
+    '''
+    def _prune(self, new_count):
+        chain = {}
+        for current_state, transition_states in self._chain.items():
+            pruned_states = {}
+            for state, count in transition_states.items():
+                count = new_count(count)
+                if count > 0:
+                    pruned_states[state] = count
+
+            if pruned_states:
+                chain[current_state] = pruned_states
 
-            self._insert_into_chain(self._prefix_chain, prefix_state, next_state)
+        self._chain = chain
+        self._totals = {current_state: self._totals[current_state] for current_state in chain}
+        self._transition_count = sum(len(transition_states) for transition_states in chain.values())
+
+
+    '''
+    Desc: Rebuilds the prefix index from the totals of the states, the count of a state
+          is the number of times its last word followed its first n - 1 words and the
+          totals are in first seen order, so the index is the same as the one built while counting
+    Params: None
+    Returns: None
+    '''
+    def _rebuild_prefix_index(self):
+        n = self._n
+        self._prefix_index = PrefixIndex()
+        for current_state, total in self._totals.items():
+            self._prefix_index.insert(current_state[:n-1], current_state[-1], total)
 
 
     '''
@@ -52,67 +246,193 @@ class MarkovChain:
     Returns: None
     '''
     def _build_chain_of_nth_order(self, data, n):
-        for sentence in data:
-            if len(sentence) == 0 or len(sentence) < n: continue
+        with timed('markov_chain.count'):
+            if self._max_transitions is not None:
+                # the budget is checked after every sentence
+                for sentence in data:
+                    self._insert_sentence(sentence, index_prefixes=False)
+                    if self._exceeds_budget():
+                        self._prune_heavy_hitters()
+            else:
+                if self._workers > 1:
+                    self._count_in_parallel(data)
+                else:
+                    self._merge_counts(*count_transitions(data, n, self._shard))
+                self._transition_count = sum(len(transition_states) for transition_states in self._chain.values())
 
-            for i in range(len(sentence) - n):
-                current_state = sentence[i:i+n]
-                next_state = sentence[i+n]
-                self._insert_into_chain(self._chain, tuple(current_state), next_state)
+        if self._is_pruned:
+            with timed('markov_chain.prune'):
+                self._prune_rare_transitions()
 
-                current_state = sentence[i:i+n]
-                self._build_prefix_chain(current_state, n)
+        # the prefix index is built from the final totals of the states that are kept
+        with timed('markov_chain.index_prefixes'):
+            self._rebuild_prefix_index()
 
-        self._chain = self._compute_transitions_probabilities(self._chain)
-        self._prefix_chain = self._compute_transitions_probabilities(self._prefix_chain)
+        with timed('markov_chain.rank_top_states'):
+            self._top_states = self._compute_top_states(self._chain)
 
 
     '''
-    Desc: Computes transition probabilities for the Markov chain
+    Desc: Counts the sentences in chunks in a process pool, a bounded number of chunks is in
+          flight so the data can be a generator
     Params:
-        chain: dict - The chain to compute probabilities for
-    Returns: dict - The Markov chain with computed probabilities
+        data: iterable - The tokenized sentences
+    Returns: None
     '''
-    def _compute_transitions_probabilities(self, chain):
+    def _count_in_parallel(self, data):
+        sentences = iter(data)
+        chunks = iter(lambda: list(itertools.islice(sentences, self.PARALLEL_CHUNK_SIZE)), [])
+
+        with create_process_pool(self._workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(count_transitions, chunk, self._n, self._shard))
+                if len(pending) >= 2 * self._workers:
+                    self._merge_counts(*pending.popleft().result())
+
+            while pending:
+                self._merge_counts(*pending.popleft().result())
+
+
+    '''
+    Desc: Adds partial counts of later sentences to the counts, states and transitions first
+          seen in the partial counts are appended so the first seen order is kept
+    Params:
+        chain: dict - The transition counts of every state
+        totals: dict - The total count of every state
+    Returns: None
+    '''
+    def _merge_counts(self, chain, totals):
+        if not self._chain:
+            self._chain, self._totals = chain, totals
+            return
+
         for current_state, transition_states in chain.items():
-            total_transitions = sum(transition_states.values()) 
-            for destination_state, transition_count  in transition_states.items():
-                chain[current_state][destination_state] = transition_count / total_transitions
+            merged_states = self._chain.get(current_state)
+            if merged_states is None:
+                self._chain[current_state] = transition_states
+                continue
+
+            for state, count in transition_states.items():
+                merged_states[state] = merged_states.get(state, 0) + count
+
+        for current_state, total in totals.items():
+            self._totals[current_state] = self._totals.get(current_state, 0) + total
 
-        return chain
-    
 
     '''
-    Desc: Gets the top three possible states from the chain
+    Desc: Ranks the transitions of every state and keeps the top k of them
     Params:
-        state: tuple - The current state
-        chain: dict - The Markov chain to get states from
-    Returns: list - Top three possible states with their probabilities
+        chain: dict - The Markov chain with transition counts
+    Returns: dict - Top k possible states for every state
     '''
-    def _get_top_three_possible_states(self, state, chain):
-        state_lower = tuple(s.lower() for s in state)
-        if state_lower in chain:
-            return sorted(chain[state_lower].items(), key=operator.itemgetter(1), reverse=True)[:3]
-        return []
-    
+    def _compute_top_states(self, chain):
+        top_states = {}
+        for current_state, transition_states in chain.items():
+            top_states[current_state] = rank_top_states(transition_states, self._top_k)
+
+        return top_states
+
+
+    '''
+    Desc: Keeps only the transition counts of the top k states of every state
+    Params: None
+    Returns: dict - The chain reduced to the top k transitions
+    '''
+    def _get_top_distributions(self):
+        return {
+            current_state: {state: self._chain[current_state][state] for state in top_states}
+            for current_state, top_states in self._top_states.items()
+        }
+
 
     '''
-    Desc: Gets the top three possible next words
+    Desc: Learns from new sentences, only the transitions, totals and top k lists of
+          the states that occur in the new sentences are updated. A chain built with min_count
+          or max_fanout keeps its budget, the states of the new sentences are pruned again,
+          so the new sentences only add transitions that pass the same limits
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    def update(self, sentences):
+        if not self._keep_distributions:
+            raise ValueError("Cannot update a Markov chain built with keep_distributions=False")
+
+        with timed('markov_chain.update'):
+            if self._min_count > 1 or self._max_fanout is not None:
+                self._update_pruned(sentences)
+            else:
+                for sentence in sentences:
+                    for current_state, next_state in self._insert_sentence(sentence):
+                        self._top_states[current_state] = update_top_states(
+                            self._top_states.get(current_state, ()),
+                            self._chain[current_state],
+                            next_state,
+                            self._top_k
+                        )
+
+            # pruning changes many states at once, so everything derived from the counts is rebuilt
+            if self._exceeds_budget():
+                self._prune_heavy_hitters()
+                self._rebuild_prefix_index()
+                self._top_states = self._compute_top_states(self._chain)
+
+
+    '''
+    Desc: Learns from new sentences in a chain built with min_count or max_fanout, the states of the new
+          sentences are pruned like after the build. The prefix index only gets the states that keep
+          transitions, like the index built from the totals of the kept states
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    def _update_pruned(self, sentences):
+        current_states = [
+            current_state
+            for sentence in sentences
+            for current_state, _ in self._insert_sentence(sentence, index_prefixes=False)
+        ]
+        self._prune_rare_transitions_of(dict.fromkeys(current_states))
+
+        n = self._n
+        for current_state in current_states:
+            if current_state in self._chain:
+                self._prefix_index.insert(current_state[:n-1], current_state[-1])
+
+        for current_state in dict.fromkeys(current_states):
+            if current_state in self._chain:
+                self._top_states[current_state] = rank_top_states(self._chain[current_state], self._top_k)
+            else:
+                self._top_states.pop(current_state, None)
+
+
+    '''
+    Desc: Gets the top k possible next words
     Params:
         state: tuple - The current state
-    Returns: list - Top three possible next words with their probabilities
+    Returns: list - Top k possible next words with their probabilities
     '''
     def get_words(self, state):
-        return self._get_top_three_possible_states(state, self._chain)
+        state_lower = tuple(s.lower() for s in state)
+        top_states = self._top_states.get(state_lower)
+        if not top_states:
+            return []
+
+        transition_states = self._chain[state_lower]
+        total_transitions = self._totals[state_lower]
+        return [(next_state, transition_states[next_state] / total_transitions) for next_state in top_states]
 
 
     '''
-    Desc: Gets the top three possible word completions with given prefix
+    Desc: Gets the top k possible word completions with given prefix
     Params:
-        state: tuple - The current state 
-    Returns: list - Top three possible word completions with their probabilities
+        state: tuple - The current state
+    Returns: list - Top k possible word completions with their probabilities
     '''
     def get_words_with_prefix(self, state):
-        return self._get_top_three_possible_states(state, self._prefix_chain)
-
+        if not state:
+            return []
 
+        state_lower = tuple(s.lower() for s in state)
+        return self._prefix_index.get_completions(state_lower[:-1], state_lower[-1], self._top_k)
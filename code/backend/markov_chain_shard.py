@@ -0,0 +1,40 @@
+from .markov_chain import MarkovChain
+
+
+class MarkovChainShard:
+
+    def __init__(self, data, max_order, shard_index, shard_count, top_k=3):
+        # every order keeps only the states of the contexts hashed to this shard, the
+        # lowest order has the empty context, so all of it belongs to a single shard
+        self.max_order = max_order
+        self.top_k = top_k
+        self._markov_chains = {
+            n: MarkovChain(data, n, top_k, shard=(shard_index, shard_count))
+            for n in range(1, max_order + 1)
+        }
+
+
+    '''
+    Desc: Gets the top k next words of the Markov chain whose order is the number of words
+    Params:
+        words: list - The state, the context words followed by the last word
+    Returns: list - Up to top_k possible next words, empty if the state is in another shard
+    '''
+    def predict_next_words(self, words):
+        markov_chain = self._markov_chains.get(len(words))
+        if markov_chain is None:
+            return []
+        return [word for word, _ in markov_chain.get_words(tuple(words))]
+
+
+    '''
+    Desc: Gets the top k endings of the partial word of the Markov chain whose order is the number of words
+    Params:
+        words: list - The context words followed by the partial word
+    Returns: list - Up to top_k possible word endings, empty if the context is in another shard
+    '''
+    def predict_word_endings(self, words):
+        markov_chain = self._markov_chains.get(len(words))
+        if markov_chain is None:
+            return []
+        return [ending for ending, _ in markov_chain.get_words_with_prefix(tuple(words))]
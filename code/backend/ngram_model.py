@@ -0,0 +1,236 @@
+import numpy as np
+
+from .backoff import merge_suggestions
+from .batch import predict_grouped
+from ..instrumentation import timed
+from .compact_ngram_model import CompactNGramModel
+from .context_node import ContextNode
+from .ranking import rank_top_states, update_top_states
+from .vocabulary import Vocabulary
+
+
+class NGramModel:
+
+    def __init__(self, data, max_order, top_k=3):
+        self.max_order = max_order
+        self.top_k = top_k
+        # increases whenever the model learns, cached suggestions of older versions are outdated
+        self.version = 0
+
+        # node at depth d holds the context of the last d words, most recent word first
+        self._root = ContextNode()
+        self._build(data)
+
+
+    '''
+    Desc: Inserts every word of a sentence into all context nodes of orders 1 to max_order in one walk
+    Params:
+        sentence: list - The tokenized sentence
+    Returns: list - Pairs of the nodes whose next word counts changed and the counted word
+    '''
+    def _insert_sentence(self, sentence):
+        counted = []
+        for i, word in enumerate(sentence):
+            is_followed = i < len(sentence) - 1
+
+            node = self._root
+            if is_followed:
+                node.add_completion(word)
+
+            for depth in range(1, min(i, self.max_order) + 1):
+                node = node.get_or_create_child(sentence[i - depth])
+                node.counts[word] = node.counts.get(word, 0) + 1
+                counted.append((node, word))
+
+                if is_followed and depth < self.max_order:
+                    node.add_completion(word)
+
+        return counted
+
+
+    '''
+    Desc: Ranks the next words of a node and keeps the top k of them
+    Params:
+        node: ContextNode - The node to rank
+    Returns: None
+    '''
+    def _compute_top_states(self, node):
+        node.top_states = rank_top_states(node.counts, self.top_k)
+
+
+    '''
+    Desc: Builds the context trie in a single pass over the data
+    Params:
+        data: iterable - The tokenized sentences to build the model from
+    Returns: None
+    '''
+    def _build(self, data):
+        with timed('ngram_model.count'):
+            for sentence in data:
+                self._insert_sentence(sentence)
+
+        with timed('ngram_model.rank_top_states'):
+            nodes = [self._root]
+            while nodes:
+                node = nodes.pop()
+                self._compute_top_states(node)
+                if node.children:
+                    nodes.extend(node.children.values())
+
+
+    '''
+    Desc: Learns from new sentences, only the nodes of contexts that occur in the new
+          sentences and their top k lists are updated
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    def update(self, sentences):
+        with timed('ngram_model.update'):
+            for sentence in sentences:
+                for node, word in self._insert_sentence(sentence):
+                    node.top_states = update_top_states(node.top_states, node.counts, word, self.top_k)
+
+        self.version += 1
+
+
+    '''
+    Desc: Walks the trie from the most recent word of the context backwards
+    Params:
+        context: list - The context words, oldest first
+    Returns: list - Nodes for the contexts of length 1 up to the longest known context
+    '''
+    def _walk(self, context):
+        nodes = []
+        node = self._root
+        for word in reversed(context):
+            node = node.get_child(word)
+            if node is None:
+                break
+            nodes.append(node)
+
+        return nodes
+
+
+    '''
+    Desc: Gets the top k next words, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the next word
+    Returns: list - Up to top_k possible next words
+    '''
+    def predict_next_words(self, words):
+        context = [word.lower() for word in words[-self.max_order:]]
+        nodes = self._walk(context)
+
+        return merge_suggestions((node.top_states for node in reversed(nodes)), self.top_k)
+
+
+    '''
+    Desc: Gets the top k endings of the last (partial) word, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the partial word followed by the partial word
+    Returns: list - Up to top_k possible word endings
+    '''
+    def predict_word_endings(self, words):
+        if not words:
+            return []
+
+        state = [word.lower() for word in words[-self.max_order:]]
+        prefix = state[-1]
+        nodes = [self._root] + self._walk(state[:-1])
+
+        return merge_suggestions((
+            [ending for ending, _ in node.completions.get_completions(prefix, self.top_k)]
+            for node in reversed(nodes) if node.completions is not None
+        ), self.top_k)
+
+
+    '''
+    Desc: Answers a batch of next word and word ending queries, identical queries are answered once
+    Params:
+        contexts: list - The words preceding the next word or the partial word of every query
+        partial_words: list - The partial word of every query, None for next word queries (default: None)
+    Returns: list - Up to top_k suggestions for every query
+    '''
+    def predict_batch(self, contexts, partial_words=None):
+        return predict_grouped(self, contexts, partial_words)
+
+
+    '''
+    Desc: Collects every word stored in the trie
+    Params: None
+    Returns: Vocabulary - The vocabulary of the model
+    '''
+    def _collect_vocabulary(self):
+        words = set()
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            words.update(node.counts)
+            if node.completions is not None:
+                words.update(word for word, _, _ in node.completions.get_entries())
+            if node.children:
+                words.update(node.children)
+                nodes.extend(node.children.values())
+
+        return Vocabulary(words)
+
+
+    '''
+    Desc: Converts the model into an array-backed model that gives the same predictions
+    Params: None
+    Returns: CompactNGramModel - The compact model
+    '''
+    def to_compact_model(self):
+        vocabulary = self._collect_vocabulary()
+
+        nodes = [self._root]
+        child_offsets = []
+        child_words = [-1]
+        top_states = []
+        count_offsets = [0]
+        count_entries = []
+        completion_offsets = [0]
+        completion_entries = []
+
+        # breadth first order keeps the children of every node next to each other
+        for node in nodes:
+            child_offsets.append(len(nodes))
+            if node.children:
+                children = sorted((vocabulary.get_id(word), child) for word, child in node.children.items())
+                child_words.extend(word_id for word_id, _ in children)
+                nodes.extend(child for _, child in children)
+
+            top_state_ids = [vocabulary.get_id(word) for word in node.top_states]
+            top_states.append(top_state_ids + [-1] * (self.top_k - len(top_state_ids)))
+
+            # the counts are kept so the compact model can learn, the rank is the first seen order breaking ties
+            count_entries.extend(sorted(
+                (vocabulary.get_id(word), count, rank) for rank, (word, count) in enumerate(node.counts.items())
+            ))
+            count_offsets.append(len(count_entries))
+
+            if node.completions is not None:
+                completion_entries.extend(sorted(
+                    (vocabulary.get_id(word), count, rank) for word, count, rank in node.completions.get_entries()
+                ))
+            completion_offsets.append(len(completion_entries))
+        child_offsets.append(len(nodes))
+
+        counts = np.array(count_entries, dtype=np.int64).reshape(-1, 3)
+        completions = np.array(completion_entries, dtype=np.int64).reshape(-1, 3)
+        arrays = {
+            'child_offsets': np.array(child_offsets, dtype=np.int64),
+            'child_words': np.array(child_words, dtype=np.int32),
+            'top_states': np.array(top_states, dtype=np.int32).reshape(-1, self.top_k),
+            'count_offsets': np.array(count_offsets, dtype=np.int64),
+            'count_words': counts[:, 0].astype(np.int32),
+            'count_values': counts[:, 1].astype(np.int32),
+            'count_ranks': counts[:, 2].astype(np.int32),
+            'completion_offsets': np.array(completion_offsets, dtype=np.int64),
+            'completion_words': completions[:, 0].astype(np.int32),
+            'completion_counts': completions[:, 1].astype(np.int32),
+            'completion_ranks': completions[:, 2].astype(np.int32)
+        }
+
+        return CompactNGramModel(vocabulary, arrays, self.max_order, self.top_k)
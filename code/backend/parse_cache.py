@@ -0,0 +1,85 @@
+import os
+import json
+import hashlib
+
+from ..instrumentation import timed
+
+
+class ParseCache:
+
+    def __init__(self, folder_path):
+        # every parsed file is stored separately as <file name>.<key>.json, the key hashes
+        # the content of the file together with the configuration of the parser
+        self._folder_path = folder_path
+        os.makedirs(folder_path, exist_ok=True)
+
+
+    '''
+    Desc: Computes the cache key of a file
+    Params:
+        file_path: str - Path to the file
+        config: str - Serialized configuration the parsed output depends on
+    Returns: str - The hexadecimal key
+    '''
+    def get_key(self, file_path, config):
+        content_hash = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                content_hash.update(block)
+
+        key = hashlib.sha256(content_hash.digest())
+        key.update(config.encode('utf-8'))
+        return key.hexdigest()
+
+
+    '''
+    Desc: Gets the path of a cache entry
+    Params:
+        file_name: str - Name of the parsed file
+        key: str - The cache key of the file
+    Returns: str - Path to the entry
+    '''
+    def _get_entry_path(self, file_name, key):
+        return os.path.join(self._folder_path, f'{file_name}.{key}.json')
+
+
+    '''
+    Desc: Loads the parsed output of a file
+    Params:
+        file_name: str - Name of the parsed file
+        key: str - The cache key of the file
+    Returns: list - The tokenized sentences or None if the file is not cached
+    '''
+    def load(self, file_name, key):
+        entry_path = self._get_entry_path(file_name, key)
+        if not os.path.exists(entry_path):
+            return None
+
+        with timed('parser.cache_load'), open(entry_path, 'r') as file:
+            return json.load(file)
+
+
+    '''
+    Desc: Stores the parsed output of a file and removes its outdated entries
+    Params:
+        file_name: str - Name of the parsed file
+        key: str - The cache key of the file
+        data: list - The tokenized sentences
+    Returns: None
+    '''
+    def store(self, file_name, key, data):
+        entry_path = self._get_entry_path(file_name, key)
+
+        # an interrupted write never leaves a truncated entry behind
+        with timed('parser.cache_save'):
+            temporary_path = entry_path + '.tmp'
+            with open(temporary_path, 'w') as file:
+                json.dump(data, file)
+            os.replace(temporary_path, entry_path)
+
+        prefix = file_name + '.'
+        for entry_name in os.listdir(self._folder_path):
+            entry_key = entry_name[len(prefix):-len('.json')]
+            if (entry_name.startswith(prefix) and entry_name.endswith('.json')
+                    and len(entry_key) == len(key) and entry_key != key):
+                os.remove(os.path.join(self._folder_path, entry_name))
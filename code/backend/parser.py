@@ -1,13 +1,23 @@
 import os
 import re
 import json
+from collections import deque
+from contextlib import nullcontext
 import pandas as pd
-from nltk.tokenize import word_tokenize 
+
+from .array_file import has_magic
+from .parse_cache import ParseCache
+from .process_pool import create_process_pool
+from .token_corpus import CORPUS_MAGIC, TokenCorpus
+from ..instrumentation import timed
 
 
 class Parser:
 
-    def __init__(self):
+    # part of the parse cache keys, increase it whenever the parsed output of the same input changes
+    CACHE_VERSION = 1
+
+    def __init__(self, fast_tokenizer=False):
         self._contractions = {
             "n't": " not",
             "'re": " are",
@@ -18,6 +28,47 @@ class Parser:
             "'m": " am",
             #"i": "I",
         }
+        # the fast tokenizer processes whole columns with precompiled regular expressions instead of
+        # NLTK, its words match word_tokenize except around the abbreviations known to punkt
+        self._fast_tokenizer = fast_tokenizer
+
+        self._contraction_pattern = re.compile(r'\b(' + '|'.join(re.escape(key) for key in self._contractions.keys()) + r')\b')
+        self._non_text_pattern = re.compile(r'[^a-zA-Z .?!]')
+        self._sentence_split_pattern = re.compile(r'(?<=[.!?]) +')
+
+        # word_tokenize splits off ?, !, runs of periods and the final period of every sentence found by
+        # punkt, which ends a sentence at the last period before ? or ! in a word unless the period ends an
+        # initial. Every other period stays inside its word which is then dropped
+        self._punctuation_pattern = re.compile(
+            r'\.{2,}|\.(?=\s*$)|[?!]'
+            r'|(?<=[a-zA-Z])(?<!^[a-zA-Z])(?<!\s[a-zA-Z])(?<!\.\.[a-zA-Z])\.'
+            r'(?=[?!](?![?!])(?:[^\s.?!]|[.?!](?![?!]))*(?!\S))'
+        )
+        # the informal contractions word_tokenize splits into two words
+        self._informal_contraction_pattern = re.compile(
+            r'(?i)\b(?:(can)(not)|(gim)(me)|(gon)(na)|(got)(ta)|(lem)(me))\b|\b(wan)(na)(?=\s|$)'
+        )
+        self._word_pattern = re.compile(r'(?<!\S)[a-z]+(?!\S)')
+
+
+    '''
+    Desc: Replaces a matched contraction with its expanded form
+    Params:
+        match: re.Match - The matched contraction
+    Returns: str - The expanded contraction
+    '''
+    def _expand_contraction(self, match):
+        return self._contractions[match.group()]
+
+
+    '''
+    Desc: Splits a matched informal contraction into two words the way word_tokenize does
+    Params:
+        match: re.Match - The matched contraction
+    Returns: str - The two words separated by spaces
+    '''
+    def _split_informal_contraction(self, match):
+        return ' ' + ' '.join(group for group in match.groups() if group) + ' '
 
 
     '''
@@ -30,10 +81,16 @@ class Parser:
     def _combine_columns(self, df, column_names):
         column_df_to_concat = []
         for name in column_names:
-            pattern = re.compile(r'\b(' + '|'.join(re.escape(key) for key in self._contractions.keys()) + r')\b') 
-            df[name] = df[name].apply(lambda text: pattern.sub(lambda x: self._contractions[x.group()], text))
-            df[name] = df[name].apply(lambda text: re.sub(r'[^a-zA-Z .?!]', '', text))
-            column_df_to_concat.append(df[name])
+            if self._fast_tokenizer:
+                # missing cells are skipped, the whole column is processed by pandas string methods
+                column = df[name].dropna().astype(str)
+                column = column.str.replace(self._contraction_pattern, self._expand_contraction, regex=True)
+                df_column = column.str.replace(self._non_text_pattern, '', regex=True)
+            else:
+                df[name] = df[name].apply(lambda text: self._contraction_pattern.sub(self._expand_contraction, text))
+                df[name] = df[name].apply(lambda text: self._non_text_pattern.sub('', text))
+                df_column = df[name]
+            column_df_to_concat.append(df_column)
         
         combined_columns = pd.concat(column_df_to_concat, axis=0).reset_index(drop=True)
         combined_dataframe = pd.DataFrame({'sentences': combined_columns})
@@ -48,9 +105,14 @@ class Parser:
     Returns: list - List of tokenized sentences
     '''
     def _tokenize_text(self, dataframe):
+        if self._fast_tokenizer:
+            return self._tokenize_text_fast(dataframe)
+
+        from nltk.tokenize import word_tokenize
+
         parsed_sentences = []
         for text in dataframe['sentences']:
-            sentences = re.split(r'(?<=[.!?]) +', text)
+            sentences = self._sentence_split_pattern.split(text)
     
             for sentence in sentences:
                 tokens = word_tokenize(sentence)
@@ -60,6 +122,44 @@ class Parser:
         return parsed_sentences
 
 
+    '''
+    Desc: Tokenizes the text in the dataframe into words with vectorized string operations,
+          the punctuation is replaced by spaces and only the purely alphabetic words are kept
+    Params:
+        dataframe: pandas.DataFrame - The input dataframe
+    Returns: list - List of tokenized sentences
+    '''
+    def _tokenize_text_fast(self, dataframe):
+        sentences = dataframe['sentences'].str.split(self._sentence_split_pattern, regex=True).explode()
+        sentences = sentences.str.replace(self._punctuation_pattern, ' ', regex=True)
+        sentences = sentences.str.replace(self._informal_contraction_pattern, self._split_informal_contraction, regex=True)
+
+        return sentences.str.lower().str.findall(self._word_pattern).tolist()
+
+
+    '''
+    Desc: Tokenizes a text the way the parser tokenizes the parsed data, e.g. a sentence typed by the
+          user the model learns from, so that it yields the same words as the training data
+    Params:
+        text: str - The text
+    Returns: list - The tokenized sentences of the text, lists of lowercase words
+    '''
+    def tokenize(self, text):
+        text = self._contraction_pattern.sub(self._expand_contraction, text)
+        text = self._non_text_pattern.sub('', text)
+
+        if not self._fast_tokenizer:
+            return self._tokenize_text(pd.DataFrame({'sentences': [text]}))
+
+        parsed_sentences = []
+        for sentence in self._sentence_split_pattern.split(text):
+            sentence = self._punctuation_pattern.sub(' ', sentence)
+            sentence = self._informal_contraction_pattern.sub(self._split_informal_contraction, sentence)
+            parsed_sentences.append(self._word_pattern.findall(sentence.lower()))
+
+        return parsed_sentences
+
+
     '''
     Desc: Parses a CSV file, combines specified columns, and tokenizes the text
     Params:
@@ -68,53 +168,204 @@ class Parser:
     Returns: list - List of tokenized sentences from the CSV file
     '''
     def _parse_csv_file(self, file_path, column_names):
-        df = pd.read_csv(file_path, usecols=column_names)
-        combined_dataframe = self._combine_columns(df, column_names)
+        with timed('parser.read_csv'):
+            df = pd.read_csv(file_path, usecols=column_names)
+        with timed('parser.combine_columns'):
+            combined_dataframe = self._combine_columns(df, column_names)
+
+        with timed('parser.tokenize'):
+            return self._tokenize_text(combined_dataframe)
+
+
+    '''
+    Desc: Combines and tokenizes a chunk of rows of a single column
+    Params:
+        chunk: pandas.DataFrame - The chunk of rows
+        column_name: str - Name of the column to parse
+    Returns: list - List of tokenized sentences from the chunk
+    '''
+    def _parse_chunk(self, chunk, column_name):
+        with timed('parser.combine_columns'):
+            combined_dataframe = self._combine_columns(chunk, [column_name])
+
+        with timed('parser.tokenize'):
+            return self._tokenize_text(combined_dataframe)
+
+
+    '''
+    Desc: Reads a CSV file in chunks of rows. Columns are read one at a time so sentences
+          come in the same order as from _parse_csv_file
+    Params:
+        file_path: str - Path to the CSV file
+        column_names: list - Names of columns to parse
+        chunksize: int - Number of rows read at once
+    Returns: generator - Pairs of chunk and the name of its column
+    '''
+    def _iter_file_chunks(self, file_path, column_names, chunksize):
+        for name in column_names:
+            for chunk in pd.read_csv(file_path, usecols=[name], dtype=str, chunksize=chunksize):
+                yield chunk, name
 
-        return self._tokenize_text(combined_dataframe)
-    
 
     '''
-    Desc: Saves parsed data to a JSON file
+    Desc: Reads all CSV files in a folder in chunks of rows
+    Params:
+        folder_path: str - Path to the folder containing CSV files
+        column_names: list - Names of columns to parse
+        chunksize: int - Number of rows read at once
+    Returns: generator - Pairs of chunk and the name of its column
+    '''
+    def _iter_chunks(self, folder_path, column_names, chunksize):
+        for file_name in os.listdir(folder_path): 
+            if file_name.endswith('.csv'):
+                file_path = os.path.join(folder_path, file_name)
+
+                yield from self._iter_file_chunks(file_path, column_names, chunksize)
+
+
+    '''
+    Desc: Parses chunks in the current process or in a process pool, sentences are yielded
+          in the order the chunks were read
+    Params:
+        chunks: iterable - Pairs of chunk and the name of its column
+        executor: ProcessPoolExecutor - The process pool, None parses in the current process (default: None)
+        workers: int - Number of worker processes of the pool (default: 1)
+    Returns: generator - Tokenized sentences from all chunks
+    '''
+    def _parse_chunks(self, chunks, executor=None, workers=1):
+        if executor is None:
+            for chunk, name in chunks:
+                yield from self._parse_chunk(chunk, name)
+            return
+
+        # a bounded number of chunks in flight keeps memory flat while every worker stays busy
+        pending = deque()
+        for chunk, name in chunks:
+            pending.append(executor.submit(self._parse_chunk, chunk, name))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+    '''
+    Desc: Parses a single CSV file
+    Params:
+        file_path: str - Path to the CSV file
+        column_names: list - Names of columns to parse
+        chunksize: int - Number of rows parsed by a worker at once
+        executor: ProcessPoolExecutor - The process pool, None parses in the current process (default: None)
+        workers: int - Number of worker processes of the pool (default: 1)
+    Returns: list - List of tokenized sentences from the CSV file
+    '''
+    def _parse_file(self, file_path, column_names, chunksize, executor=None, workers=1):
+        if executor is None:
+            return self._parse_csv_file(file_path, column_names)
+
+        chunks = self._iter_file_chunks(file_path, column_names, chunksize)
+        return list(self._parse_chunks(chunks, executor, workers))
+
+
+    '''
+    Desc: Serializes everything besides the content of a file the parsed output depends on
+    Params:
+        column_names: list - Names of columns to parse
+    Returns: str - The configuration as JSON
+    '''
+    def _get_cache_config(self, column_names):
+        return json.dumps({
+            'version': self.CACHE_VERSION,
+            'column_names': list(column_names),
+            'contractions': self._contractions,
+            'fast_tokenizer': self._fast_tokenizer
+        }, sort_keys=True)
+
+
+    '''
+    Desc: Saves parsed data to a token corpus file, the words are stored once in a vocabulary
+          and the sentences as a flat array of word IDs
     Params:
         data: list - The parsed data to save
         file_path: str - File path to file to save the data
     Returns: None
     '''
     def _save_parsed_data(self, data, file_path):
-        with open(file_path, 'w') as file:
-            json.dump(data, file, indent=4)
+        with timed('parser.save'):
+            TokenCorpus.from_sentences(data).save(file_path)
 
 
     '''
-    Desc: Loads parsed data from a JSON file
+    Desc: Loads parsed data from a token corpus file or from a JSON file saved by older versions
     Params:
         file_path: str - File path to load the data from
-    Returns: list - The loaded parsed data
+    Returns: TokenCorpus or list - The memory-mapped corpus iterating over the tokenized sentences,
+                                   or the list of tokenized sentences of a JSON file
     '''
     def load_parsed_data(self, file_path):
-        with open(file_path, 'r') as file:
-            data = json.load(file)
+        with timed('parser.load'):
+            if has_magic(file_path, CORPUS_MAGIC):
+                return TokenCorpus.load(file_path)
+
+            with open(file_path, 'r') as file:
+                data = json.load(file)
         return data
 
 
     '''
-    Desc: Parses all CSV files in a folder and optionally saves the parsed data
+    Desc: Parses all CSV files in a folder and optionally saves the parsed data. With a cache folder
+          only new or changed files are parsed, the output of the others is loaded from the cache
     Params:
         folder_path: str - Path to the folder containing CSV files
         column_names: list - Names of columns to parse
         save_parsed_data_path: str - Path to save the parsed data (optional)
+        workers: int - Number of worker processes, 1 parses in the current process (default: 1)
+        chunksize: int - Number of rows parsed by a worker at once (default: 10000)
+        cache_folder_path: str - Path to the folder to cache the output of every file in (optional)
     Returns: list - The parsed data from all CSV files
     '''
-    def parse_data(self, folder_path, column_names, save_parsed_data_path=None):
+    def parse_data(self, folder_path, column_names, save_parsed_data_path=None, workers=1, chunksize=10000, cache_folder_path=None):
+        cache = ParseCache(cache_folder_path) if cache_folder_path else None
+        config = self._get_cache_config(column_names)
+
         parsed_data = []
-        for file_name in os.listdir(folder_path): 
-            if file_name.endswith('.csv'):
-                file_path = os.path.join(folder_path, file_name)
-                
-                parsed_data.extend(self._parse_csv_file(file_path, column_names))
+        with create_process_pool(workers) if workers > 1 else nullcontext() as executor:
+            for file_name in os.listdir(folder_path): 
+                if file_name.endswith('.csv'):
+                    file_path = os.path.join(folder_path, file_name)
+
+                    key = cache.get_key(file_path, config) if cache else None
+                    file_data = cache.load(file_name, key) if cache else None
+                    if file_data is None:
+                        file_data = self._parse_file(file_path, column_names, chunksize, executor, workers)
+                        if cache:
+                            cache.store(file_name, key, file_data)
+
+                    parsed_data.extend(file_data)
 
         if save_parsed_data_path:
             self._save_parsed_data(parsed_data, save_parsed_data_path)
 
         return parsed_data
+
+
+    '''
+    Desc: Streams tokenized sentences from all CSV files in a folder without keeping them in memory,
+          the generator can be passed directly to MarkovChain or NGramModel. With several workers the
+          chunks are parsed in a process pool and yielded in the order they were read
+    Params:
+        folder_path: str - Path to the folder containing CSV files
+        column_names: list - Names of columns to parse
+        chunksize: int - Number of rows read at once (default: 10000)
+        workers: int - Number of worker processes, 1 parses in the current process (default: 1)
+    Returns: generator - Tokenized sentences from all CSV files
+    '''
+    def iter_parsed_data(self, folder_path, column_names, chunksize=10000, workers=1):
+        chunks = self._iter_chunks(folder_path, column_names, chunksize)
+
+        if workers <= 1:
+            yield from self._parse_chunks(chunks)
+            return
+
+        with create_process_pool(workers) as executor:
+            yield from self._parse_chunks(chunks, executor, workers)
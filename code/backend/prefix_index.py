@@ -0,0 +1,104 @@
+import bisect
+import heapq
+
+
+class WordCompletions:
+
+    def __init__(self):
+        self._counts = {}
+        self._ranks = {}
+        self._words = []
+        self._sorted = True
+
+
+    '''
+    Desc: Adds an occurrence of a word
+    Params:
+        word: str - The word to add
+        count: int - The number of occurrences to add (default: 1)
+    Returns: None
+    '''
+    def add(self, word, count=1):
+        if word in self._counts:
+            self._counts[word] += count
+        else:
+            self._counts[word] = count
+            self._ranks[word] = len(self._ranks)
+            self._words.append(word)
+            self._sorted = False
+
+
+    '''
+    Desc: Gets all words with their counts and first seen ranks
+    Params: None
+    Returns: list - Tuples of word, count and rank in first seen order
+    '''
+    def get_entries(self):
+        return [(word, count, self._ranks[word]) for word, count in self._counts.items()]
+
+
+    '''
+    Desc: Gets the top k word endings for words starting with the given prefix,
+          ties are broken by the order in which the words were first added
+    Params:
+        prefix: str - The beginning of the word
+        k: int - The number of word endings to return
+    Returns: list - Top k word endings with their probabilities
+    '''
+    def get_completions(self, prefix, k):
+        if not prefix:
+            return []
+
+        if not self._sorted:
+            self._words.sort()
+            self._sorted = True
+
+        candidates = []
+        total_count = 0
+        for i in range(bisect.bisect_left(self._words, prefix), len(self._words)):
+            word = self._words[i]
+            if not word.startswith(prefix):
+                break
+            if len(word) > len(prefix):
+                candidates.append(word)
+                total_count += self._counts[word]
+
+        top_words = heapq.nlargest(k, candidates, key=lambda word: (self._counts[word], -self._ranks[word]))
+        return [(word[len(prefix):], self._counts[word] / total_count) for word in top_words]
+
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        self._contexts = {}
+
+
+    '''
+    Desc: Inserts a word that followed the given context
+    Params:
+        context: tuple - The words preceding the word
+        word: str - The word to insert
+        count: int - How many times the word followed the context (default: 1)
+    Returns: None
+    '''
+    def insert(self, context, word, count=1):
+        completions = self._contexts.get(context)
+        if completions is None:
+            completions = self._contexts[context] = WordCompletions()
+        completions.add(word, count)
+
+
+    '''
+    Desc: Gets the top k completions of a partial word that follows the given context
+    Params:
+        context: tuple - The words preceding the partial word
+        prefix: str - The partial word
+        k: int - The number of completions to return
+    Returns: list - Top k word endings with their probabilities
+    '''
+    def get_completions(self, context, prefix, k):
+        completions = self._contexts.get(context)
+        if completions is None:
+            return []
+        return completions.get_completions(prefix, k)
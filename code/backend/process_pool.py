@@ -0,0 +1,21 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+'''
+Desc: Creates a process pool whose workers are spawned instead of forked. Parsing and building may
+      run in a thread while other threads hold locks (the window loads the model in a background
+      thread), and a forked child could wait forever for a lock copied in a locked state
+Params:
+    workers: int - Number of worker processes
+    initializer: callable - Function called in every worker when it starts (optional)
+    initargs: tuple - The arguments of the initializer, they are pickled for every worker (default: ())
+Returns: ProcessPoolExecutor - The process pool
+'''
+def create_process_pool(workers, initializer=None, initargs=()):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=initializer,
+        initargs=initargs
+    )
@@ -0,0 +1,48 @@
+import heapq
+import operator
+
+
+'''
+Desc: Ranks the states of a distribution by count, ties keep the order in which the states were first counted
+Params:
+    counts: dict - The counts of the states in first seen order
+    k: int - The number of states to keep
+Returns: tuple - Top k states
+'''
+def rank_top_states(counts, k):
+    return tuple(state for state, _ in heapq.nlargest(k, counts.items(), key=operator.itemgetter(1)))
+
+
+'''
+Desc: Updates the top k states after the count of one state was increased by one, the full
+      ranking is only recomputed when the new count ties with another top state because
+      ties are ranked by first occurrence which only the order of the distribution knows
+Params:
+    top_states: tuple - Top k states before the count was increased
+    counts: dict - The counts of the states in first seen order, already increased
+    state: str - The state whose count was increased
+    k: int - The number of states to keep
+Returns: tuple - Top k states
+'''
+def update_top_states(top_states, counts, state, k):
+    count = counts[state]
+    other_states = [top_state for top_state in top_states if top_state != state]
+
+    if len(other_states) == len(top_states):
+        # a new state ranks after every state counted before it
+        if count == 1:
+            return top_states + (state,) if len(top_states) < k else top_states
+        if len(top_states) == k and count < counts[top_states[-1]]:
+            return top_states
+
+    position = 0
+    for other_state in other_states:
+        other_count = counts[other_state]
+        if other_count == count:
+            return rank_top_states(counts, k)
+        if other_count < count:
+            break
+        position += 1
+
+    other_states.insert(position, state)
+    return tuple(other_states[:k])
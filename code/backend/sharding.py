@@ -0,0 +1,13 @@
+import zlib
+
+
+'''
+Desc: Gets the shard a context belongs to, the hash is stable across processes and
+      runs unlike the built-in hash of strings
+Params:
+    context: tuple - The lowercase words of the context
+    shard_count: int - The number of shards
+Returns: int - The index of the shard
+'''
+def get_shard(context, shard_count):
+    return zlib.crc32(' '.join(context).encode('utf-8')) % shard_count
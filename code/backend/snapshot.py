@@ -0,0 +1,45 @@
+from .array_file import load_arrays, save_arrays
+from .compact_ngram_model import CompactNGramModel
+from .vocabulary import Vocabulary
+
+
+SNAPSHOT_MAGIC = b'TACSNAP\x00'
+SNAPSHOT_VERSION = 2
+
+
+'''
+Desc: Saves a built model to a versioned binary snapshot file, the file holds a small
+      JSON header followed by the aligned raw arrays of the model and its vocabulary.
+      Sentences a compact model learned after it was loaded are not saved
+Params:
+    model: NGramModel or CompactNGramModel - The model to save
+    file_path: str - Path to the snapshot file
+Returns: None
+'''
+def save_snapshot(model, file_path):
+    if not isinstance(model, CompactNGramModel):
+        model = model.to_compact_model()
+
+    arrays = dict(model.get_arrays())
+    arrays['vocabulary_data'], arrays['vocabulary_offsets'] = model.get_vocabulary().to_buffers()
+
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'max_order': model.max_order,
+        'top_k': model.top_k
+    }
+    save_arrays(file_path, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, header, arrays)
+
+
+'''
+Desc: Loads a model from a snapshot file, the file is memory-mapped so the arrays
+      are paged in lazily when queries touch them
+Params:
+    file_path: str - Path to the snapshot file
+Returns: CompactNGramModel - The loaded model
+'''
+def load_snapshot(file_path):
+    header, arrays = load_arrays(file_path, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 'model snapshot')
+
+    vocabulary = Vocabulary.from_buffers(arrays.pop('vocabulary_data'), arrays.pop('vocabulary_offsets'))
+    return CompactNGramModel(vocabulary, arrays, header['max_order'], header['top_k'])
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+
+
+class SuggestionCache:
+
+    def __init__(self, model, max_size=4096):
+        # the cache answers like the model it wraps, the version of the model
+        # increases whenever it learns and the cache is cleared then
+        self._model = model
+        self.max_order = model.max_order
+        self.top_k = model.top_k
+
+        self._max_size = max_size
+        self._suggestions = OrderedDict()
+        self._version = getattr(model, 'version', 0)
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+
+    '''
+    Desc: Gets the suggestions of a query from the cache or from the model. Models only look at the
+          last max_order words in lowercase, so only these words are part of the key
+    Params:
+        words: list - The words of the query
+        use_prefix: bool - Whether the last word is a partial word to complete
+    Returns: list - The suggestions
+    '''
+    def _get_suggestions(self, words, use_prefix):
+        version = getattr(self._model, 'version', 0)
+        if version != self._version:
+            self._suggestions.clear()
+            self._version = version
+            self._invalidations += 1
+
+        key = (tuple(map(str.lower, words[-self.max_order:])), use_prefix)
+        suggestions = self._suggestions.get(key)
+        if suggestions is not None:
+            self._hits += 1
+            self._suggestions.move_to_end(key)
+            return list(suggestions)
+
+        self._misses += 1
+        if use_prefix:
+            suggestions = tuple(self._model.predict_word_endings(words))
+        else:
+            suggestions = tuple(self._model.predict_next_words(words))
+
+        self._suggestions[key] = suggestions
+        if len(self._suggestions) > self._max_size:
+            self._suggestions.popitem(last=False)
+            self._evictions += 1
+
+        return list(suggestions)
+
+
+    '''
+    Desc: Gets the top k next words
+    Params:
+        words: list - The words preceding the next word
+    Returns: list - Up to top_k possible next words
+    '''
+    def predict_next_words(self, words):
+        return self._get_suggestions(words, use_prefix=False)
+
+
+    '''
+    Desc: Gets the top k endings of the last (partial) word
+    Params:
+        words: list - The words preceding the partial word followed by the partial word
+    Returns: list - Up to top_k possible word endings
+    '''
+    def predict_word_endings(self, words):
+        return self._get_suggestions(words, use_prefix=True)
+
+
+    '''
+    Desc: Answers a batch of queries with the model, batches group identical queries themselves
+    Params:
+        contexts: list - The words preceding the next word or the partial word of every query
+        partial_words: list - The partial word of every query, None for next word queries (default: None)
+    Returns: list - Up to top_k suggestions for every query
+    '''
+    def predict_batch(self, contexts, partial_words=None):
+        return self._model.predict_batch(contexts, partial_words)
+
+
+    '''
+    Desc: Learns from new sentences, the cached suggestions are dropped at the next query
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    def update(self, sentences):
+        self._model.update(sentences)
+
+
+    '''
+    Desc: Drops all cached suggestions
+    Params: None
+    Returns: None
+    '''
+    def clear(self):
+        self._suggestions.clear()
+
+
+    '''
+    Desc: Gets the statistics of the cache
+    Params: None
+    Returns: dict - Hits, misses, hit rate, evictions, invalidations and the current size
+    '''
+    def get_stats(self):
+        lookups = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups, 4) if lookups else None,
+            'evictions': self._evictions,
+            'invalidations': self._invalidations,
+            'size': len(self._suggestions),
+            'max_size': self._max_size
+        }
@@ -0,0 +1,118 @@
+import array
+import itertools
+
+import numpy as np
+
+from .array_file import load_arrays, save_arrays
+from .vocabulary import Vocabulary
+
+
+CORPUS_MAGIC = b'TACCORP\x00'
+CORPUS_VERSION = 1
+
+
+class TokenCorpus:
+
+    # number of sentences decoded at once while iterating over the sentences
+    ITER_BLOCK_SIZE = 4096
+
+    def __init__(self, vocabulary, tokens, offsets):
+        # tokens are the word IDs of all sentences in one flat array, sentence i
+        # spans tokens[offsets[i]:offsets[i + 1]]
+        self.vocabulary = vocabulary
+        self.tokens = tokens
+        self.offsets = offsets
+        self._words = None
+
+
+    '''
+    Desc: Interns the words of tokenized sentences into a flat array of word IDs
+    Params:
+        sentences: iterable - The tokenized sentences
+    Returns: TokenCorpus - The corpus with its vocabulary, token IDs and sentence offsets
+    '''
+    @classmethod
+    def from_sentences(cls, sentences):
+        first_seen_ids = {}
+        tokens = array.array('i')
+        offsets = array.array('q', [0])
+
+        for sentence in sentences:
+            for word in sentence:
+                word_id = first_seen_ids.get(word)
+                if word_id is None:
+                    word_id = first_seen_ids[word] = len(first_seen_ids)
+                tokens.append(word_id)
+            offsets.append(len(tokens))
+
+        # IDs are assigned in first seen order while reading, remap them to the sorted vocabulary order
+        vocabulary = Vocabulary(first_seen_ids)
+        remap = np.array([vocabulary.get_id(word) for word in first_seen_ids], dtype=np.int32)
+        token_ids = remap[np.frombuffer(tokens, dtype=np.int32)] if len(tokens) else np.zeros(0, dtype=np.int32)
+
+        return cls(vocabulary, token_ids, np.frombuffer(offsets, dtype=np.int64).copy())
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    '''
+    Desc: Saves the corpus to a binary file holding the vocabulary, the token IDs and the sentence
+          offsets as raw arrays
+    Params:
+        file_path: str - Path to the corpus file
+    Returns: None
+    '''
+    def save(self, file_path):
+        arrays = {'tokens': self.tokens, 'offsets': self.offsets}
+        arrays['vocabulary_data'], arrays['vocabulary_offsets'] = self.vocabulary.to_buffers()
+        save_arrays(file_path, CORPUS_MAGIC, CORPUS_VERSION, {'version': CORPUS_VERSION}, arrays)
+
+
+    '''
+    Desc: Loads a corpus saved by save, the file is memory-mapped so the token IDs
+          are paged in lazily while the sentences are read
+    Params:
+        file_path: str - Path to the corpus file
+    Returns: TokenCorpus - The loaded corpus
+    '''
+    @classmethod
+    def load(cls, file_path):
+        _, arrays = load_arrays(file_path, CORPUS_MAGIC, CORPUS_VERSION, 'token corpus')
+        vocabulary = Vocabulary.from_buffers(arrays['vocabulary_data'], arrays['vocabulary_offsets'])
+        return cls(vocabulary, arrays['tokens'], arrays['offsets'])
+
+
+    '''
+    Desc: Iterates over the word IDs of every sentence without decoding any word
+    Params: None
+    Returns: generator - The word IDs of every sentence as a view of the token array
+    '''
+    def iter_token_ids(self):
+        for start, end in itertools.pairwise(self.offsets.tolist()):
+            yield self.tokens[start:end]
+
+
+    '''
+    Desc: Iterates over the sentences as lists of words, every word is decoded once and all
+          its occurrences share the same string, so the corpus can be passed to MarkovChain
+          or NGramModel like parsed data
+    Params: None
+    Returns: generator - The tokenized sentences
+    '''
+    def __iter__(self):
+        if self._words is None:
+            self._words = np.array(
+                [self.vocabulary.get_word(word_id) for word_id in range(len(self.vocabulary))], dtype=object
+            )
+
+        # the words of a block of sentences are looked up at once and the block is split into sentences
+        offsets = self.offsets.tolist()
+        for block_start in range(0, len(offsets) - 1, self.ITER_BLOCK_SIZE):
+            block_offsets = offsets[block_start:block_start + self.ITER_BLOCK_SIZE + 1]
+            first = block_offsets[0]
+            block_words = self._words[self.tokens[first:block_offsets[-1]]].tolist()
+
+            for start, end in itertools.pairwise(block_offsets):
+                yield block_words[start - first:end - first]
@@ -0,0 +1,115 @@
+import bisect
+
+import numpy as np
+
+
+class EncodedWords:
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+    def __getitem__(self, index):
+        return self._data[self._offsets[index]:self._offsets[index + 1]].tobytes().decode('utf-8')
+
+
+
+class Vocabulary:
+
+    def __init__(self, words):
+        self._words = sorted(set(words))
+        self._ids = {word: word_id for word_id, word in enumerate(self._words)}
+
+
+    '''
+    Desc: Creates a vocabulary over UTF-8 encoded sorted words, words are decoded only when accessed
+    Params:
+        data: numpy.ndarray - The concatenated UTF-8 encoded words
+        offsets: numpy.ndarray - The start offset of every word followed by the end offset of the last word
+    Returns: Vocabulary - The vocabulary
+    '''
+    @classmethod
+    def from_buffers(cls, data, offsets):
+        vocabulary = cls([])
+        vocabulary._words = EncodedWords(data, offsets)
+        vocabulary._ids = None
+        return vocabulary
+
+
+    '''
+    Desc: Encodes the sorted words into buffers accepted by from_buffers
+    Params: None
+    Returns: tuple - The concatenated UTF-8 encoded words and their offsets
+    '''
+    def to_buffers(self):
+        encoded_words = [word.encode('utf-8') for word in self._words]
+        offsets = np.zeros(len(encoded_words) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(word) for word in encoded_words], dtype=np.int64)
+        data = np.frombuffer(b''.join(encoded_words), dtype=np.uint8)
+
+        return data, offsets
+
+
+    def __len__(self):
+        return len(self._words)
+
+
+    '''
+    Desc: Gets the integer ID of a word
+    Params:
+        word: str - The word to look up
+    Returns: int - The ID of the word or None if the word is unknown
+    '''
+    def get_id(self, word):
+        if self._ids is not None:
+            return self._ids.get(word)
+
+        word_id = bisect.bisect_left(self._words, word)
+        if word_id < len(self._words) and self._words[word_id] == word:
+            return word_id
+        return None
+
+
+    '''
+    Desc: Gets the integer IDs of several words
+    Params:
+        words: iterable - The words to look up
+    Returns: list - The IDs of the words or None if any of the words is unknown
+    '''
+    def get_ids(self, words):
+        ids = []
+        for word in words:
+            word_id = self.get_id(word)
+            if word_id is None:
+                return None
+            ids.append(word_id)
+
+        return ids
+
+
+    '''
+    Desc: Gets the word with the given ID
+    Params:
+        word_id: int - The ID of the word
+    Returns: str - The word
+    '''
+    def get_word(self, word_id):
+        return self._words[word_id]
+
+
+    '''
+    Desc: Gets the range of IDs of all words starting with a prefix, the IDs
+          are assigned in sorted order so the words form one contiguous range
+    Params:
+        prefix: str - The beginning of the words
+    Returns: tuple - The first ID and the ID after the last matching word
+    '''
+    def prefix_range(self, prefix):
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_right(self._words, prefix, lo=start, key=lambda word: word[:len(prefix)])
+        return start, end
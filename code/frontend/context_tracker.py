@@ -0,0 +1,129 @@
+class ContextTracker:
+
+    def __init__(self, document):
+        self._document = document
+
+        # complete words as (start, word) pairs in document order, the text from the start of
+        # the first word up to the scanned end was tokenized and has not been edited since
+        self._words = []
+        self._scanned_end = 0
+
+        self._document.contentsChange.connect(self._on_contents_change)
+
+
+    '''
+    Desc: Forgets the words an edit may have changed or moved
+    Params:
+        position: int - The position of the edit
+        chars_removed: int - The number of removed characters
+        chars_added: int - The number of added characters
+    Returns: None
+    '''
+    def _on_contents_change(self, position, chars_removed, chars_added):
+        self._forget_after(position)
+
+
+    '''
+    Desc: Forgets the words that end at or after a position, a word ending exactly at the
+          position is forgotten too because typing at the position could extend it
+    Params:
+        position: int - The position after which the text is not known anymore
+    Returns: None
+    '''
+    def _forget_after(self, position):
+        self._scanned_end = min(self._scanned_end, position)
+        while self._words and self._words[-1][0] + len(self._words[-1][1]) >= self._scanned_end:
+            self._words.pop()
+
+
+    '''
+    Desc: Gets a character of the document, positions outside of the document read as whitespace
+    Params:
+        position: int - The position of the character
+    Returns: str - The character
+    '''
+    def _get_character(self, position):
+        if position < 0:
+            return ' '
+        return self._document.characterAt(position)
+
+
+    '''
+    Desc: Gets the character before a position
+    Params:
+        position: int - The position
+    Returns: str - The character or an empty string at the start of the document
+    '''
+    def get_character_before(self, position):
+        if position <= 0:
+            return ''
+        return self._document.characterAt(position - 1)
+
+
+    '''
+    Desc: Gets the last n whitespace separated words before a position by scanning backwards
+          from the position, words tokenized by earlier scans are reused so only the text
+          edited since then is read again
+    Params:
+        position: int - The position to scan from, usually the cursor position
+        n: int - The maximum number of words
+    Returns: list - Up to n words, oldest first, the last one ends at the position if the
+                    position is inside or right after a word
+    '''
+    def get_words(self, position, n):
+        self._forget_after(position)
+
+        found_words = []
+        characters = []
+        i = position - 1
+        while len(found_words) < n:
+            character = self._get_character(i)
+            if not character.isspace():
+                characters.append(character)
+                i -= 1
+                continue
+
+            if characters:
+                found_words.append((i + 1, ''.join(reversed(characters))))
+                characters = []
+                if len(found_words) == n:
+                    break
+
+            if i < 0:
+                break
+
+            # the words before a separator in the scanned text are already known
+            known_words = [word for word in self._words if word[0] + len(word[1]) <= i] if i < self._scanned_end else []
+            if known_words:
+                known_words = known_words[-(n - len(found_words)):]
+                found_words.extend(reversed(known_words))
+                i = known_words[0][0]
+
+            i -= 1
+
+        found_words.reverse()
+        self._words = [word for word in found_words if word[0] + len(word[1]) < position]
+        self._scanned_end = position
+
+        return [word for _, word in found_words]
+
+
+    '''
+    Desc: Gets the sentence before a sentence terminator, the sentence starts after the
+          previous terminator or at the start of the document
+    Params:
+        position: int - The position right after the terminator of the sentence
+        terminators: str - The characters terminating a sentence
+    Returns: tuple - The start of the sentence and its text without the terminator
+    '''
+    def get_last_sentence(self, position, terminators):
+        characters = []
+        i = position - 2
+        while i >= 0:
+            character = self._document.characterAt(i)
+            if character in terminators:
+                break
+            characters.append(character)
+            i -= 1
+
+        return i + 1, ''.join(reversed(characters))
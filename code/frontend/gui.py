@@ -1,6 +1,7 @@
 import sys
 import os
 import re
+import functools
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.insert(0, project_root)
@@ -16,8 +17,15 @@ from PyQt6.QtWidgets import (
 )
 
 from PyQt6.QtGui import QTextCharFormat, QColor, QTextCursor, QPalette
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 
+from code.backend.backoff import MarkovChainBackoff
+from code.backend.learned_sentences import append_learned_sentences
+from code.backend.suggestion_cache import SuggestionCache
+from code.frontend.prediction_worker import PredictionWorker
+from code.frontend.model_loader import ModelLoader
+from code.frontend.context_tracker import ContextTracker
+from code.instrumentation import count, timed
 
 
 class Window(QMainWindow):
@@ -36,12 +44,21 @@ class Window(QMainWindow):
     Returns: None
     '''
     def _initialize_attributes(self):
-        self._markov_chains = None
+        self._model = None
+        self._learn_from_typing = False
+        self._learned_sentences_path = None
+        self._markov_chains = []
+        self._model_loader = None
+        self._last_learned_sentence = None
+        self._parser = None
         self._current_state = ''
         self._prefix_length = 0
         self._word_ending_length = 0
         self._last_text_length = 0
         self._cursor_locked = False
+        self._prediction_delay_ms = 30
+        self._request_id = 0
+        self._pending_prediction = None
 
     
     '''
@@ -90,55 +107,255 @@ class Window(QMainWindow):
         main_layout.addWidget(self._text_edit)
 
         self._text_edit.textChanged.connect(self._complete_word)
+        self._create_text_formats()
+
+        # the words before the cursor are read from the document around the cursor only
+        self._context_tracker = ContextTracker(self._text_edit.document())
+
+        # predictions run in a worker thread, a burst of keystrokes sends only one request
+        self._prediction_worker = PredictionWorker()
+        self._prediction_worker.predicted.connect(self._apply_prediction)
+
+        self._prediction_timer = QTimer(self)
+        self._prediction_timer.setSingleShot(True)
+        self._prediction_timer.setInterval(self._prediction_delay_ms)
+        self._prediction_timer.timeout.connect(self._request_prediction)
 
         
     '''
-    Desc: Sets the Markov chain for text prediction
+    Desc: Sets the Markov chains for text prediction, can be called again whenever a higher order
+          is ready, the chains of the lowest orders are enough to start predicting
     Params:
-        markov_chain: MarkovChain - The Markov chain object
+        markov_chains: list - The Markov chain objects ordered from the highest order to the lowest,
+                              the lowest order is 1
     Returns: None
     '''
     def set_markov_chains(self, markov_chains):
-        self._markov_chains = markov_chains
+        self.set_model(MarkovChainBackoff(markov_chains))
+
+
+    '''
+    Desc: Sets the model for text prediction, the text typed while no model was set is predicted right away
+    Params:
+        model: NGramModel - The model providing backoff predictions
+        learn_from_typing: bool - Whether to update the model with finished sentences (default: False)
+        learned_sentences_path: str - File the learned sentences are appended to, so they can be learned again
+                                      when the model is loaded next time, learning lasts one session without it (optional)
+        fast_tokenizer: bool - Whether the parsed data was tokenized by the fast tokenizer, typed sentences
+                               are tokenized the same way (default: False)
+    Returns: None
+    '''
+    def set_model(self, model, learn_from_typing=False, learned_sentences_path=None, fast_tokenizer=False):
+        had_model = self._model is not None
+        self._model = model
+        self._learn_from_typing = learn_from_typing
+        self._learned_sentences_path = learned_sentences_path
+        if learn_from_typing:
+            # typed sentences are tokenized like the parsed data, the parser is imported only when learning
+            from code.backend.parser import Parser
+            self._parser = Parser(fast_tokenizer=fast_tokenizer)
+        # contexts like sentence starts come up again and again, their suggestions are cached
+        self._prediction_worker.set_model(SuggestionCache(model))
+
+        if not had_model and self._get_text_length() > 0:
+            self._prediction_timer.start()
+
+
+    '''
+    Desc: Loads the model in a background thread, the window can be used while it is loading
+    Params:
+        load: callable - Function returning the model, it is called in the loading thread
+        learn_from_typing: bool - Whether to update the model with finished sentences (default: False)
+        learned_sentences_path: str - File the learned sentences are appended to (optional)
+        fast_tokenizer: bool - Whether the parsed data was tokenized by the fast tokenizer (default: False)
+    Returns: None
+    '''
+    def load_model(self, load, learn_from_typing=False, learned_sentences_path=None, fast_tokenizer=False):
+        self._start_loading(
+            functools.partial(self._load_single_model, load),
+            functools.partial(
+                self.set_model, learn_from_typing=learn_from_typing,
+                learned_sentences_path=learned_sentences_path, fast_tokenizer=fast_tokenizer
+            )
+        )
+
+
+    '''
+    Desc: Builds the Markov chains in a background thread from the lowest order to the highest, every
+          order is used for predictions as soon as it is built
+    Params:
+        load_data: callable - Function returning the tokenized sentences, it is called in the loading
+                              thread and must return a list since every order is built from it
+        max_order: int - The highest order of the Markov chains
+        top_k: int - The number of next words kept for every state (default: 3)
+    Returns: None
+    '''
+    def load_markov_chains(self, load_data, max_order, top_k=3):
+        self._markov_chains = []
+        self._start_loading(
+            functools.partial(self._build_markov_chains, load_data, max_order, top_k),
+            self._add_markov_chain
+        )
+
+
+    '''
+    Desc: Starts a model loader, a loader that is still running is stopped first
+    Params:
+        load: callable - Generator function yielding the loaded items
+        on_loaded: callable - Called in the thread of the window with every loaded item
+    Returns: None
+    '''
+    def _start_loading(self, load, on_loaded):
+        if self._model_loader is not None:
+            self._model_loader.stop()
+
+        self._model_loader = ModelLoader()
+        self._model_loader.loaded.connect(on_loaded)
+        self._model_loader.failed.connect(self._show_loading_error)
+        self._model_loader.finished.connect(self._finish_loading)
+
+        self.statusBar().showMessage('Loading the model...')
+        self._model_loader.start(load)
+
+
+    '''
+    Desc: Loads a single model, runs in the loading thread
+    Params:
+        load: callable - Function returning the model
+    Returns: generator - The loaded model
+    '''
+    def _load_single_model(self, load):
+        yield load()
+
+
+    '''
+    Desc: Builds the Markov chains from the lowest order to the highest, runs in the loading thread
+    Params:
+        load_data: callable - Function returning the tokenized sentences
+        max_order: int - The highest order of the Markov chains
+        top_k: int - The number of next words kept for every state
+    Returns: generator - The Markov chain of every order
+    '''
+    def _build_markov_chains(self, load_data, max_order, top_k):
+        # numpy is imported in the loading thread, after the window is shown
+        from code.backend.markov_chain import MarkovChain
+
+        data = load_data()
+        for n in range(1, max_order + 1):
+            with timed('loader.markov_chain'):
+                markov_chain = MarkovChain(data, n, top_k)
+            yield markov_chain
+
+
+    '''
+    Desc: Adds the Markov chain of the next higher order built in the background
+    Params:
+        markov_chain: MarkovChain - The Markov chain of the next order
+    Returns: None
+    '''
+    def _add_markov_chain(self, markov_chain):
+        self._markov_chains.insert(0, markov_chain)
+        self.set_markov_chains(list(self._markov_chains))
+        self.statusBar().showMessage(f'Markov chain of order {len(self._markov_chains)} ready, loading...')
+
+
+    '''
+    Desc: Clears the loading message once everything is loaded
+    Params: None
+    Returns: None
+    '''
+    def _finish_loading(self):
+        self.statusBar().showMessage('Model loaded', 3000)
+
+
+    '''
+    Desc: Shows why the model could not be loaded
+    Params:
+        message: str - The error message
+    Returns: None
+    '''
+    def _show_loading_error(self, message):
+        self.statusBar().showMessage(f'Loading the model failed: {message}')
+
+
+    '''
+    Desc: Stops the prediction worker when the window is closed
+    Params:
+        event: QCloseEvent - The close event
+    Returns: None
+    '''
+    def closeEvent(self, event):
+        self._prediction_timer.stop()
+        self._prediction_worker.stop()
+        if self._model_loader is not None:
+            self._model_loader.stop()
+        super().closeEvent(event)
+
+
+    '''
+    Desc: Creates the character formats of the typed text and of the suggested word ending
+    Params: None
+    Returns: None
+    '''
+    def _create_text_formats(self):
+        text_color = self._text_edit.palette().color(QPalette.ColorRole.Text)
+        highlighted_text_color = self._text_edit.palette().color(QPalette.ColorRole.Text)
+        highlighted_text_color.setAlpha(140)
+
+        self._text_format = QTextCharFormat()
+        self._text_format.setForeground(text_color)
+        self._highlighted_text_format = QTextCharFormat()
+        self._highlighted_text_format.setForeground(highlighted_text_color)
 
 
     '''
-    Desc: Colors a specified text range
+    Desc: Creates a cursor selecting a text range of the document, the cursor of the
+          text edit widget is not moved
+    Params:
+        start_index: int - The starting index of the range
+        length: int - The length of the range
+    Returns: QTextCursor - The cursor selecting the range
+    '''
+    def _select_text(self, start_index, length):
+        cursor = QTextCursor(self._text_edit.document())
+        cursor.setPosition(start_index)
+        cursor.setPosition(start_index + length, QTextCursor.MoveMode.KeepAnchor)
+        return cursor
+
+
+    '''
+    Desc: Colors a specified text range, only the characters in the range are touched
     Params:
         start_index: int - The starting index of the text to color
         length: int - The length of the text to color
+        char_format: QTextCharFormat - The format to apply
     Returns: None
     '''
-    def _color_text(self, start_index, length):
-        self._text_edit.blockSignals(True)
-        cursor = self._text_edit.textCursor()
-        text = self._text_edit.toPlainText()
-        self._text_edit.clear()
-    
-        for i, char in enumerate(text):
-            text_color = self._text_edit.palette().color(QPalette.ColorRole.Text)
-            highlighted_text_color = self._text_edit.palette().color(QPalette.ColorRole.Text)
-            highlighted_text_color.setAlpha(140)
-            
-            color = highlighted_text_color if start_index <= i < start_index + length else text_color
-            self._set_text_color(cursor, char, color)
+    def _color_text(self, start_index, length, char_format):
+        if length <= 0:
+            return
 
-        self._text_edit.blockSignals(False)
+        with timed('gui.color_text'):
+            self._text_edit.blockSignals(True)
+            self._select_text(start_index, length).setCharFormat(char_format)
+            self._text_edit.blockSignals(False)
 
 
     '''
-    Desc: Sets the color for a specific text
+    Desc: Inserts text at a specified position
     Params:
-        cursor: QTextCursor - The cursor object
-        text: str - The text to color
-        color: QColor - The color to apply
+        position: int - The position to insert at
+        text: str - The text to insert
+        char_format: QTextCharFormat - The format of the inserted text
     Returns: None
     '''
-    def _set_text_color(self, cursor, text, color):
-        char_format = QTextCharFormat()
-        char_format.setForeground(color)
-        cursor.setCharFormat(char_format)
-        cursor.insertText(text)
+    def _insert_text(self, position, text, char_format):
+        with timed('gui.insert_text'):
+            self._text_edit.blockSignals(True)
+            cursor = QTextCursor(self._text_edit.document())
+            cursor.setPosition(position)
+            cursor.insertText(text, char_format)
+            self._text_edit.blockSignals(False)
 
 
     '''
@@ -177,15 +394,12 @@ class Window(QMainWindow):
 
 
     '''
-    Desc: Sets the text in the text edit widget
-    Params:
-        text: str - The text to set
-    Returns: None
+    Desc: Gets the length of the text in the text edit widget without copying the text
+    Params: None
+    Returns: int - The length of the text
     '''
-    def _set_text(self, text):
-        self._text_edit.blockSignals(True)
-        self._text_edit.setPlainText(text)
-        self._text_edit.blockSignals(False)
+    def _get_text_length(self):
+        return self._text_edit.document().characterCount() - 1
 
 
     '''
@@ -229,11 +443,11 @@ class Window(QMainWindow):
     '''
     def _update_after_tab(self):
         cursor_pos = self._get_cursor_position()
-        text = self._text_edit.toPlainText()[:cursor_pos + self._word_ending_length]
+        words = self._context_tracker.get_words(cursor_pos + self._word_ending_length, 1)
 
-        words = text.split()
         if words:
             self._cursor_locked = True
+            self._color_text(cursor_pos, self._word_ending_length, self._text_format)
             self._set_cursor_position(cursor_pos + self._word_ending_length)
             self._set_states(words[-1])
 
@@ -241,20 +455,22 @@ class Window(QMainWindow):
     '''
     Desc: Removes text from the text edit widget
     Params:
-        cursor_pos: int - The cursor position
-        offset: int - The offset for text removal
-        text_edit_plaint_text: str - The current text in the widget
+        position: int - The starting index of the text to remove
+        length: int - The length of the text to remove
     Returns: None
     '''
-    def _remove_text(self, cursor_pos, offset, text_edit_plaint_text):
-        self._set_text(
-            text_edit_plaint_text[:cursor_pos] + 
-            text_edit_plaint_text[cursor_pos + offset:]
-        )
+    def _remove_text(self, position, length):
+        if length <= 0:
+            return
+
+        with timed('gui.remove_text'):
+            self._text_edit.blockSignals(True)
+            self._select_text(position, length).removeSelectedText()
+            self._text_edit.blockSignals(False)
 
 
     '''
-    Desc: Updates the state after a cursor change
+    Desc: Updates the state after a cursor change, the suggested word ending is removed
     Params:
         previous_cursor_position: int - The previous cursor position
     Returns: None
@@ -262,39 +478,24 @@ class Window(QMainWindow):
     def _update_after_cursor_change(self, previous_cursor_position):
         
         if not self._cursor_locked:
-            self._cursor_locked = True
-            cursor_pos = self._get_cursor_position() 
-            text_edit_plaint_text = self._text_edit.toPlainText()
-
-            if len(text_edit_plaint_text) > self._last_text_length:
-                self._remove_text(
-                    cursor_pos, 
-                    self._word_ending_length ,
-                    text_edit_plaint_text
-                )
-            elif len(text_edit_plaint_text) < self._last_text_length: 
-                self._remove_text(
-                    cursor_pos, 
-                    self._word_ending_length, 
-                    text_edit_plaint_text
-                )
-            else:
-                self._remove_text(
-                    previous_cursor_position, 
-                    self._word_ending_length, 
-                    text_edit_plaint_text
-                )
+            with timed('gui.update_after_cursor_change'):
+                self._cursor_locked = True
+                self._cancel_prediction()
+                cursor_pos = self._get_cursor_position() 
 
-            self._set_states()
-            self._set_cursor_position(0)
+                # typing or deleting shifts the word ending to the new cursor position
+                if self._get_text_length() != self._last_text_length:
+                    self._remove_text(cursor_pos, self._word_ending_length)
+                else:
+                    self._remove_text(previous_cursor_position, self._word_ending_length)
 
-            current_text_length = len(self._text_edit.toPlainText())
-            self._color_text(current_text_length, current_text_length)
+                self._set_states()
 
-            if cursor_pos >= current_text_length:
-                self._set_cursor_position(current_text_length)
-            else:
-                self._set_cursor_position(cursor_pos)
+                current_text_length = self._get_text_length()
+                if cursor_pos >= current_text_length:
+                    self._set_cursor_position(current_text_length)
+                else:
+                    self._set_cursor_position(cursor_pos)
 
 
     '''
@@ -306,60 +507,61 @@ class Window(QMainWindow):
     def _match_sentence_end(self, text):
         return bool(re.search(r'[.!?\s]$', text))
 
-    
+
     '''
-    Desc: Updates the text in the text edit widget
+    Desc: Checks if the text ends with a sentence-terminating punctuation
     Params:
-        text: str - The new text to set
-        cursor_pos: int - The new cursor position
-    Returns: None
+        text: str - The text to check
+    Returns: bool - True if the text ends with a sentence-terminating punctuation, False otherwise
     '''
-    def _update_text(self, text, cursor_pos):
-        self._set_text(text)
-        self._color_text(cursor_pos, self._word_ending_length)
-        self._set_cursor_position(cursor_pos)
-        self._last_text_length = len(self._text_edit.toPlainText())
+    def _match_sentence_terminator(self, text):
+        return bool(re.search(r'[.!?]$', text))
 
 
     '''
-    Desc: Retrieves the top three possible next states based on the Markov chains
+    Desc: Updates the model with the sentence that was just finished, tokenized like the parsed data.
+          The same sentence is learned only once even if its terminating punctuation is typed again
     Params:
-        number_of_markov_chains: int - The number of Markov chains to consider
-        last_state: list - The last state(s) to use as context
-        use_prefix: bool - Whether to use prefix matching (default: False)
-    Returns: list - Up to three possible next states
-    '''
-    def _get_top_three_possible_states(self, number_of_markov_chains, last_state, use_prefix=False):
-        words = []
-        for i, markov_chain in enumerate(self._markov_chains):
-            look_back_words = -(number_of_markov_chains - i)
-            if use_prefix:
-                top_three_words = markov_chain.get_words_with_prefix(tuple(last_state[look_back_words:]))
-            else:
-                top_three_words = markov_chain.get_words(tuple(last_state[look_back_words:]))
+        cursor_pos: int - The cursor position, right after a sentence-terminating punctuation
+    Returns: None
+    '''
+    def _learn_last_sentence(self, cursor_pos):
+        sentence_start, sentence = self._context_tracker.get_last_sentence(cursor_pos, '.!?')
+        sentences = [words for words in self._parser.tokenize(sentence) if words]
 
-            top_three_states = [val[0] for val in top_three_words]
-            words.extend(top_three_states)
-            words = list(dict.fromkeys(words))
-            
-            if len(words) >= 3:
-                break
+        if sentences and (sentence_start, sentences) != self._last_learned_sentence:
+            self._prediction_worker.request_learning(sentences)
+            self._last_learned_sentence = (sentence_start, sentences)
+            if self._learned_sentences_path:
+                append_learned_sentences(self._learned_sentences_path, sentences)
 
-        return words[:3]
+    
+    '''
+    Desc: Shows the suggested ending of the word before the cursor
+    Params:
+        word_ending: str - The suggested word ending
+        cursor_pos: int - The cursor position
+    Returns: None
+    '''
+    def _show_word_ending(self, word_ending, cursor_pos):
+        if word_ending:
+            self._insert_text(cursor_pos, word_ending, self._highlighted_text_format)
+        self._set_cursor_position(cursor_pos)
+        self._last_text_length = self._get_text_length()
 
 
     '''
     Desc: Processes the end of a word in a text
     Params:
         words: list - The list of words in the text
+        next_states: list - The predicted next words
     Returns: None
     '''
-    def _process_word_end(self, words):
+    def _process_word_end(self, words, next_states):
         if words:
-            number_of_markov_chains = len(self._markov_chains)
-            self._set_states(words[-number_of_markov_chains:], self._prefix_length, self._word_ending_length)
+            max_order = self._model.max_order
+            self._set_states(words[-max_order:], self._prefix_length, self._word_ending_length)
             
-            next_states = self._get_top_three_possible_states(number_of_markov_chains, self._current_state)
             self._update_buttons(prefix='', prefix_endings=next_states)
     
 
@@ -367,61 +569,95 @@ class Window(QMainWindow):
     Desc: Processes a word for auto-completion
     Params:
         words: list - The list of words in the text
-    Returns: str - The new text with the processed word
+        next_prefix_states: list - The predicted endings of the last word
+    Returns: str - The suggested ending of the word
     '''
-    def _process_word(self, words):
-        number_of_markov_chains = len(self._markov_chains)
-        last_words = words[-number_of_markov_chains:]
-        next_prefix_states = self._get_top_three_possible_states(number_of_markov_chains, last_words, use_prefix=True)
-
+    def _process_word(self, words, next_prefix_states):
         word_ending = next_prefix_states[0] if next_prefix_states else ''
 
         last_word = words[-1]
         self._update_buttons(last_word, next_prefix_states)
         self._set_states(self._current_state, len(last_word), len(word_ending))
 
-        completed_word = last_word + word_ending
-        words[-1] = completed_word
-        new_text = ' '.join(words)
-
-        return new_text
+        return word_ending
 
 
     '''
-    Desc: Processes the text for auto-completion
-    Params:
-        text: str - The text to process
-    Returns: str - The processed text
+    Desc: Completes the current word, the prediction itself is requested after a short delay
+          so that fast typing does not queue a prediction for every keystroke
+    Params: None
+    Returns: None
     '''
-    def _process_text(self, text):
-        new_text = text
-        words = text.split()
+    def _complete_word(self):
+        with timed('gui.complete_word'):
+            self._cursor_locked = False
+            self._cancel_prediction()
+            cursor_pos = self._get_cursor_position()
+            last_character = self._context_tracker.get_character_before(cursor_pos)
 
-        if self._match_sentence_end(text):
-            self._process_word_end(words)
-        elif words:
-            new_text = self._process_word(words)
-        
-        return new_text
+            self._clear_buttons_text()
+            self._last_text_length = self._get_text_length()
+
+            if self._learn_from_typing and self._match_sentence_terminator(last_character):
+                self._learn_last_sentence(cursor_pos)
+
+            self._prediction_timer.start()
 
 
     '''
-    Desc: Completes the current word
+    Desc: Cancels the scheduled prediction and drops results of already sent requests
     Params: None
     Returns: None
     '''
-    def _complete_word(self):
-        self._cursor_locked = False
+    def _cancel_prediction(self):
+        self._prediction_timer.stop()
+        self._request_id += 1
+
+
+    '''
+    Desc: Sends the words before the cursor to the prediction worker
+    Params: None
+    Returns: None
+    '''
+    def _request_prediction(self):
+        if self._model is None:
+            return
+
         cursor_pos = self._get_cursor_position()
-        text_edit_plaint_text = self._text_edit.toPlainText()
+        with timed('gui.get_context'):
+            words = self._context_tracker.get_words(cursor_pos, self._model.max_order)
+        if not words:
+            return
 
-        text_until_cursor = text_edit_plaint_text[:cursor_pos]
-        text_after_cursor = text_edit_plaint_text[cursor_pos:]
+        use_prefix = not self._match_sentence_end(self._context_tracker.get_character_before(cursor_pos))
 
-        self._clear_buttons_text()
+        self._request_id += 1
+        self._pending_prediction = (cursor_pos, words, use_prefix)
+        self._prediction_worker.request_prediction(self._request_id, words, use_prefix)
+
+
+    '''
+    Desc: Applies a prediction to the buttons and the text, results of requests made before
+          the latest edit or cursor move are dropped
+    Params:
+        request_id: int - ID of the request the prediction belongs to
+        suggestions: list - The predicted words or word endings
+    Returns: None
+    '''
+    def _apply_prediction(self, request_id, suggestions):
+        if request_id != self._request_id:
+            count('gui.stale_predictions')
+            return
 
-        new_text = self._process_text(text_until_cursor)
-        self._update_text(new_text + text_after_cursor, cursor_pos)
+        with timed('gui.apply_prediction'):
+            cursor_pos, words, use_prefix = self._pending_prediction
+            suggestions = suggestions[:len(self._buttons)]
+
+            if use_prefix:
+                word_ending = self._process_word(words, suggestions)
+                self._show_word_ending(word_ending, cursor_pos)
+            else:
+                self._process_word_end(words, suggestions)
 
 
     '''
@@ -435,18 +671,18 @@ class Window(QMainWindow):
             return
 
         self._cursor_locked = True
+        self._cancel_prediction()
         cursor_pos = self._get_cursor_position()
-        text = self._text_edit.toPlainText()
-
-        text_until_word_in_crusor_range = text[:cursor_pos - self._prefix_length]
-        text_after_word_in_crusor_range = text[cursor_pos + self._word_ending_length:]
+        word_start = cursor_pos - self._prefix_length
 
         self._clear_buttons_text()
 
-        new_cursor_pos = len(text_until_word_in_crusor_range) + len(new_word)
-        new_text = text_until_word_in_crusor_range + new_word + text_after_word_in_crusor_range
+        self._remove_text(word_start, self._prefix_length + self._word_ending_length)
+        self._insert_text(word_start, new_word, self._text_format)
+
+        new_cursor_pos = word_start + len(new_word)
         self._set_states(current_state='', prefix_length=0, word_ending_length=0)
-        self._update_text(new_text, new_cursor_pos)
+        self._show_word_ending('', new_cursor_pos)
 
         # Set focus back to the text edit widget
         self._text_edit.setFocus()
@@ -0,0 +1,71 @@
+import threading
+import traceback
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from code.instrumentation import profile_current_thread, timed
+
+
+
+class ModelLoader(QObject):
+
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        # loading runs in a daemon thread, a build cannot be interrupted, so closing the window
+        # must not wait for it. The signals are queued to the thread of the window
+        self._thread = None
+        self._stopped = threading.Event()
+
+
+    '''
+    Desc: Starts loading in the background, every item the load function yields is emitted by the
+          loaded signal as soon as it is ready
+    Params:
+        load: callable - Generator function that loads or builds the models
+    Returns: None
+    '''
+    def start(self, load):
+        self._thread = threading.Thread(target=self._load, args=(load,), name='model-loader', daemon=True)
+        self._thread.start()
+
+
+    '''
+    Desc: Stops emitting loaded items, the item that is currently loading is dropped
+    Params: None
+    Returns: None
+    '''
+    def stop(self):
+        self._stopped.set()
+
+
+    '''
+    Desc: Checks whether the loading thread is still running
+    Params: None
+    Returns: bool - True if loading has not finished yet
+    '''
+    def is_loading(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+    '''
+    Desc: Runs the load function and emits its items
+    Params:
+        load: callable - Generator function that loads or builds the models
+    Returns: None
+    '''
+    def _load(self, load):
+        profile_current_thread()
+        try:
+            with timed('loader.load'):
+                for item in load():
+                    if self._stopped.is_set():
+                        return
+                    self.loaded.emit(item)
+            self.finished.emit()
+        except Exception as error:
+            traceback.print_exc()
+            self.failed.emit(f'{type(error).__name__}: {error}')
@@ -0,0 +1,107 @@
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from code.instrumentation import count, profile_current_thread, timed
+
+
+
+class PredictionWorker(QObject):
+
+    predicted = pyqtSignal(int, list)
+    _prediction_requested = pyqtSignal(int, list, bool)
+    _learning_requested = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self._model = None
+        self._latest_request_id = 0
+
+        # the worker lives in its own thread, requests reach it through queued signals
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._prediction_requested.connect(self._predict)
+        self._learning_requested.connect(self._learn)
+        self._thread.start()
+
+
+    '''
+    Desc: Sets the model used for predictions
+    Params:
+        model: NGramModel - The model providing backoff predictions
+    Returns: None
+    '''
+    def set_model(self, model):
+        self._model = model
+
+
+    '''
+    Desc: Requests a prediction, the result is emitted by the predicted signal. Requests that are
+          still queued when a newer request arrives are skipped
+    Params:
+        request_id: int - Increasing ID of the request
+        words: list - The words to predict from
+        use_prefix: bool - Whether the last word is a partial word to complete
+    Returns: None
+    '''
+    def request_prediction(self, request_id, words, use_prefix):
+        self._latest_request_id = request_id
+        self._prediction_requested.emit(request_id, words, use_prefix)
+
+
+    '''
+    Desc: Requests the model to learn from new sentences, learning runs in the worker thread
+          so it never races with predictions
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    def request_learning(self, sentences):
+        self._learning_requested.emit(sentences)
+
+
+    '''
+    Desc: Stops the worker thread
+    Params: None
+    Returns: None
+    '''
+    def stop(self):
+        self._thread.quit()
+        self._thread.wait()
+
+
+    '''
+    Desc: Computes a prediction unless a newer request is already waiting
+    Params:
+        request_id: int - ID of the request
+        words: list - The words to predict from
+        use_prefix: bool - Whether the last word is a partial word to complete
+    Returns: None
+    '''
+    @pyqtSlot(int, list, bool)
+    def _predict(self, request_id, words, use_prefix):
+        profile_current_thread()
+        if request_id != self._latest_request_id or self._model is None:
+            count('predict.skipped_requests')
+            return
+
+        if use_prefix:
+            with timed('predict.word_endings'):
+                suggestions = self._model.predict_word_endings(words)
+        else:
+            with timed('predict.next_words'):
+                suggestions = self._model.predict_next_words(words)
+
+        self.predicted.emit(request_id, suggestions)
+
+
+    '''
+    Desc: Updates the model with new sentences
+    Params:
+        sentences: list - The new tokenized sentences
+    Returns: None
+    '''
+    @pyqtSlot(list)
+    def _learn(self, sentences):
+        profile_current_thread()
+        if self._model is not None:
+            with timed('predict.learn'):
+                self._model.update(sentences)
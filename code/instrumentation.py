@@ -0,0 +1,363 @@
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import signal
+import threading
+import time
+from collections import deque
+
+
+# Instrumentation of the hot paths, disabled by default. Phases are timed with
+#
+#     with timed('gui.complete_word'):
+#         ...
+#
+# which costs a single function call while the instrumentation is disabled. It is enabled
+# by enable() or by setting the TAC_INSTRUMENTATION environment variable to 1, the statistics
+# are then dumped at exit to the JSON file named by TAC_INSTRUMENTATION_DUMP (or printed) and
+# TAC_INSTRUMENTATION_PROFILE=1 profiles with cProfile as well. A cProfile profiler only sees the
+# thread that enabled it, so threads call profile_current_thread() (the model loader when it starts,
+# the prediction worker in every slot) and the profiles of all threads are merged when dumped.
+# Worker processes, e.g. the shard workers and the process pools, are not profiled.
+
+
+class PhaseStats:
+
+    # durations fall into power of two buckets of microseconds, the last bucket takes the rest
+    BUCKET_COUNT = 32
+
+    __slots__ = ('count', 'total_ns', 'max_ns', 'samples', 'buckets')
+
+    def __init__(self, rolling_window):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.samples = deque(maxlen=rolling_window)
+        self.buckets = [0] * self.BUCKET_COUNT
+
+
+    '''
+    Desc: Adds the duration of one run of the phase
+    Params:
+        duration_ns: int - The duration in nanoseconds
+    Returns: None
+    '''
+    def add(self, duration_ns):
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        self.samples.append(duration_ns)
+        self.buckets[min((duration_ns // 1000).bit_length(), self.BUCKET_COUNT - 1)] += 1
+
+
+    '''
+    Desc: Summarizes the phase, the percentiles cover the rolling window of the latest runs
+    Params: None
+    Returns: dict - Counts, times in milliseconds and the histogram
+    '''
+    def summarize(self):
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] / 1e6, 4)
+
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ns / 1e6, 3),
+            'mean_ms': round(self.total_ns / self.count / 1e6, 4) if self.count else None,
+            'max_ms': round(self.max_ns / 1e6, 4),
+            'window_p50_ms': percentile(0.5),
+            'window_p99_ms': percentile(0.99),
+            'histogram_us': {
+                f'<{2 ** i}' if i < self.BUCKET_COUNT - 1 else f'>={2 ** (i - 1)}': count
+                for i, count in enumerate(self.buckets) if count
+            }
+        }
+
+
+
+class _Timer:
+
+    __slots__ = ('_name', '_start')
+
+    def __init__(self, name):
+        self._name = name
+
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self._name, time.perf_counter_ns() - self._start)
+        return False
+
+
+
+class _ProfileSnapshot:
+
+    def __init__(self, profiler):
+        # pstats reads the stats through create_stats, which would disable the profiler in the
+        # calling thread, the snapshot reads them without touching the profiler
+        profiler.snapshot_stats()
+        self.stats = profiler.stats
+
+
+    def create_stats(self):
+        pass
+
+
+
+class _NullTimer:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+
+_NULL_TIMER = _NullTimer()
+
+_enabled = False
+_rolling_window = 1000
+_phases = {}
+_counters = {}
+_lock = threading.Lock()
+_profiling = False
+_profilers = {}
+_dump_path = None
+_dump_registered = False
+
+
+'''
+Desc: Times a named phase when the instrumentation is enabled
+Params:
+    name: str - The name of the phase
+Returns: context manager - Records the duration of its block
+'''
+def timed(name):
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+'''
+Desc: Records the duration of one run of a phase
+Params:
+    name: str - The name of the phase
+    duration_ns: int - The duration in nanoseconds
+Returns: None
+'''
+def record(name, duration_ns):
+    if not _enabled:
+        return
+
+    with _lock:
+        phase = _phases.get(name)
+        if phase is None:
+            phase = _phases[name] = PhaseStats(_rolling_window)
+        phase.add(duration_ns)
+
+
+'''
+Desc: Increases a named counter when the instrumentation is enabled
+Params:
+    name: str - The name of the counter
+    value: int - The increment (default: 1)
+Returns: None
+'''
+def count(name, value=1):
+    if not _enabled:
+        return
+
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+'''
+Desc: Checks whether the instrumentation is enabled
+Params: None
+Returns: bool - True if phases and counters are recorded
+'''
+def is_enabled():
+    return _enabled
+
+
+'''
+Desc: Enables the instrumentation
+Params:
+    profile: bool - Whether to profile the calling thread and the threads calling profile_current_thread
+                    with cProfile as well (default: False)
+    dump_path: str - Path of the JSON file the statistics are dumped to, printed if omitted (optional)
+    dump_at_exit: bool - Whether to dump the statistics when the process exits (default: True if dump_path is given)
+    rolling_window: int - The number of latest runs of a phase the percentiles cover (default: 1000)
+Returns: None
+'''
+def enable(profile=False, dump_path=None, dump_at_exit=None, rolling_window=1000):
+    global _enabled, _rolling_window, _profiling, _dump_path, _dump_registered
+
+    _rolling_window = rolling_window
+    _enabled = True
+
+    if profile:
+        _profiling = True
+        profile_current_thread()
+
+    _dump_path = dump_path
+    if dump_at_exit is None:
+        dump_at_exit = bool(dump_path)
+
+    if dump_at_exit:
+        if not _dump_registered:
+            atexit.register(_dump_at_exit)
+            _dump_registered = True
+
+    # SIGUSR1 dumps the statistics of a running process on demand. The handler runs on the main thread
+    # between two bytecodes, possibly while it holds the lock in record, so the dump runs in a thread
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, _dump_on_signal)
+
+
+'''
+Desc: Profiles the calling thread with its own cProfile profiler while profiling is enabled, threads that
+      should appear in the profile call it when they start. Slots of Qt threads call it on every call,
+      PyQt may run each call with a new Python thread state that has no profiler installed
+Params: None
+Returns: None
+'''
+def profile_current_thread():
+    if not _profiling:
+        return
+
+    thread_id = threading.get_ident()
+    with _lock:
+        profiler = _profilers.get(thread_id)
+        if profiler is None:
+            profiler = _profilers[thread_id] = cProfile.Profile()
+    profiler.enable()
+
+
+'''
+Desc: Disables the instrumentation, recorded statistics are kept until reset. The profilers of other
+      threads can only be stopped by their own threads, their profiles keep growing until the threads end
+Params: None
+Returns: None
+'''
+def disable():
+    global _enabled, _profiling
+    _enabled = False
+    _profiling = False
+
+    profiler = _profilers.get(threading.get_ident())
+    if profiler is not None:
+        profiler.disable()
+
+
+'''
+Desc: Clears all recorded phases, counters and profiles
+Params: None
+Returns: None
+'''
+def reset():
+    with _lock:
+        _phases.clear()
+        _counters.clear()
+        profilers = list(_profilers.values())
+
+    for profiler in profilers:
+        profiler.clear()
+
+
+'''
+Desc: Gets the statistics of all phases and counters
+Params: None
+Returns: dict - The phase summaries and the counters
+'''
+def get_stats():
+    with _lock:
+        return {
+            'phases': {name: phase.summarize() for name, phase in sorted(_phases.items())},
+            'counters': dict(sorted(_counters.items()))
+        }
+
+
+'''
+Desc: Merges the profiles of all profiled threads
+Params: None
+Returns: pstats.Stats - The merged profile or None if no thread was profiled
+'''
+def _get_profile():
+    with _lock:
+        profilers = list(_profilers.values())
+
+    # pstats refuses empty profiles, e.g. of a thread that has not run anything yet
+    snapshots = [snapshot for snapshot in map(_ProfileSnapshot, profilers) if snapshot.stats]
+    if not snapshots:
+        return None
+    return pstats.Stats(*snapshots)
+
+
+'''
+Desc: Writes the statistics as JSON, the cProfile statistics of all profiled threads are written next to them
+Params:
+    file_path: str - Path of the JSON file, the statistics are printed if omitted (optional)
+Returns: None
+'''
+def dump(file_path=None):
+    stats = json.dumps(get_stats(), indent=4)
+
+    if file_path:
+        with open(file_path, 'w') as file:
+            file.write(stats)
+    else:
+        print(stats)
+
+    profile = _get_profile()
+    if profile is not None:
+        if file_path:
+            profile.dump_stats(os.path.splitext(file_path)[0] + '.prof')
+        else:
+            output = io.StringIO()
+            profile.stream = output
+            profile.sort_stats('cumulative').print_stats(30)
+            print(output.getvalue())
+
+
+'''
+Desc: Dumps the statistics on SIGUSR1 in a new thread, the main thread may hold the lock of the statistics
+Params:
+    signal_number: int - The number of the signal
+    frame: frame - The frame the main thread was interrupted in
+Returns: None
+'''
+def _dump_on_signal(signal_number, frame):
+    threading.Thread(target=dump, args=(_dump_path,), name='instrumentation-dump', daemon=True).start()
+
+
+'''
+Desc: Writes the statistics to the dump path when the process exits
+Params: None
+Returns: None
+'''
+def _dump_at_exit():
+    disable()
+    dump(_dump_path)
+
+
+if os.environ.get('TAC_INSTRUMENTATION') == '1':
+    enable(
+        profile=os.environ.get('TAC_INSTRUMENTATION_PROFILE') == '1',
+        dump_path=os.environ.get('TAC_INSTRUMENTATION_DUMP'),
+        dump_at_exit=True
+    )
@@ -0,0 +1,6 @@
+from .prediction_server import PredictionServer
+from .prediction_client import PredictionClient
+from .shard_router import ShardRouter
+from .shard_worker import run_shard_worker
+
+__all__ = ['PredictionServer', 'PredictionClient', 'ShardRouter', 'run_shard_worker']
\ No newline at end of file
@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+import json
+
+
+class PredictionClient:
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._request_ids = itertools.count()
+
+        # responses arrive in request order, so pending requests are answered first in first out
+        self._pending = []
+        self._reading = asyncio.ensure_future(self._read_responses())
+
+
+    '''
+    Desc: Connects to a prediction server on a TCP port
+    Params:
+        host: str - The host of the server (default: '127.0.0.1')
+        port: int - The port of the server (default: 8765)
+    Returns: PredictionClient - The connected client
+    '''
+    @classmethod
+    async def connect_tcp(cls, host='127.0.0.1', port=8765):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+
+    '''
+    Desc: Connects to a prediction server on a Unix socket
+    Params:
+        path: str - Path to the socket file
+    Returns: PredictionClient - The connected client
+    '''
+    @classmethod
+    async def connect_unix(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+
+    '''
+    Desc: Sends a request without waiting for the responses of earlier requests
+    Params:
+        request_type: str - The type of the query, "next_words" or "word_endings"
+        words: list - The words preceding the next word or ending with the partial word
+    Returns: dict - The response with the "suggestions" (or an "error") and the "latency_ms" of the server
+    '''
+    async def request(self, request_type, words):
+        request = {'id': next(self._request_ids), 'type': request_type, 'words': list(words)}
+        response = asyncio.get_running_loop().create_future()
+        self._pending.append(response)
+        self._writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await self._writer.drain()
+        return await response
+
+
+    '''
+    Desc: Gets the top k next words
+    Params:
+        words: list - The words preceding the next word
+    Returns: list - The possible next words
+    '''
+    async def predict_next_words(self, words):
+        return self._get_suggestions(await self.request('next_words', words))
+
+
+    '''
+    Desc: Gets the top k endings of the last (partial) word
+    Params:
+        words: list - The words preceding the partial word followed by the partial word
+    Returns: list - The possible word endings
+    '''
+    async def predict_word_endings(self, words):
+        return self._get_suggestions(await self.request('word_endings', words))
+
+
+    '''
+    Desc: Closes the connection, pending requests fail with a ConnectionError
+    Params: None
+    Returns: None
+    '''
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._reading
+
+
+    '''
+    Desc: Gets the suggestions of a response
+    Params:
+        response: dict - The response of the server
+    Returns: list - The suggestions
+    '''
+    def _get_suggestions(self, response):
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['suggestions']
+
+
+    '''
+    Desc: Resolves the pending requests with the responses of the server
+    Params: None
+    Returns: None
+    '''
+    async def _read_responses(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                self._pending.pop(0).set_result(json.loads(line))
+        except ConnectionError:
+            pass
+        finally:
+            for response in self._pending:
+                response.set_exception(ConnectionError('Connection to the prediction server was closed'))
+            self._pending.clear()
@@ -0,0 +1,136 @@
+import asyncio
+import inspect
+import json
+import time
+
+
+class PredictionServer:
+
+    def __init__(self, model):
+        # one model is shared by all clients, requests are answered on the event loop
+        # thread one at a time so models that learn never race with predictions. Models
+        # with coroutine methods, like the shard router, are awaited
+        self._model = model
+        self._server = None
+
+
+    '''
+    Desc: Starts listening on a local TCP port
+    Params:
+        host: str - The host to bind to (default: '127.0.0.1')
+        port: int - The port to bind to, 0 picks a free port (default: 8765)
+    Returns: None
+    '''
+    async def start_tcp(self, host='127.0.0.1', port=8765):
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+
+
+    '''
+    Desc: Starts listening on a Unix socket
+    Params:
+        path: str - Path to the socket file
+    Returns: None
+    '''
+    async def start_unix(self, path):
+        self._server = await asyncio.start_unix_server(self._handle_client, path)
+
+
+    '''
+    Desc: Gets the addresses the server listens on
+    Params: None
+    Returns: list - The socket addresses
+    '''
+    def get_addresses(self):
+        return [sock.getsockname() for sock in self._server.sockets]
+
+
+    '''
+    Desc: Serves clients until the server is closed
+    Params: None
+    Returns: None
+    '''
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+
+    '''
+    Desc: Stops accepting clients and waits until the server is closed
+    Params: None
+    Returns: None
+    '''
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+    '''
+    Desc: Answers the requests of one client, every line holds one JSON request and is answered
+          by one JSON line, clients may send further requests before reading the responses
+          which are written in the order of the requests
+    Params:
+        reader: asyncio.StreamReader - The stream of requests
+        writer: asyncio.StreamWriter - The stream of responses
+    Returns: None
+    '''
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the request does not fit into the buffer of the stream, the stream cannot be resynchronized
+                    writer.write(json.dumps({'id': None, 'error': 'Request too long'}).encode('utf-8') + b'\n')
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                received_at = time.perf_counter()
+                response = await self._handle_request(line)
+                response['latency_ms'] = round((time.perf_counter() - received_at) * 1000, 3)
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+
+                # drain only waits while the client is not reading, pipelined requests
+                # already in the buffer are answered without a round trip each
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    '''
+    Desc: Answers a single request
+    Params:
+        line: bytes - The JSON encoded request with an optional "id", the "type" of the query
+                      ("next_words" or "word_endings") and the preceding "words"
+    Returns: dict - The response with the "id" of the request and either the "suggestions" or an "error"
+    '''
+    async def _handle_request(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'id': None, 'error': 'Invalid JSON'}
+
+        if not isinstance(request, dict):
+            return {'id': None, 'error': 'Request must be a JSON object'}
+
+        request_id = request.get('id')
+        words = request.get('words')
+        if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+            return {'id': request_id, 'error': '"words" must be a list of strings'}
+
+        request_type = request.get('type')
+        if request_type == 'next_words':
+            suggestions = self._model.predict_next_words(words)
+        elif request_type == 'word_endings':
+            suggestions = self._model.predict_word_endings(words)
+        else:
+            return {'id': request_id, 'error': f'Unknown request type: {request_type}'}
+
+        if inspect.isawaitable(suggestions):
+            suggestions = await suggestions
+
+        return {'id': request_id, 'suggestions': suggestions}
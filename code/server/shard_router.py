@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from code.backend.backoff import merge_suggestions
+from code.backend.sharding import get_shard
+from code.server.prediction_client import PredictionClient
+
+
+class ShardRouter:
+
+    def __init__(self, clients, max_order, top_k=3):
+        # one client per shard server, the order of the clients is the order of the shards
+        self._clients = clients
+        self.max_order = max_order
+        self.top_k = top_k
+
+
+    '''
+    Desc: Connects to the shard servers listening on Unix sockets, waits for shards that are still building
+    Params:
+        paths: list - Paths to the socket files ordered by shard index
+        max_order: int - The highest order of the Markov chains
+        top_k: int - The number of suggestions to return (default: 3)
+        timeout: float - Seconds to wait for a shard to accept connections (default: 600)
+    Returns: ShardRouter - The connected router
+    '''
+    @classmethod
+    async def connect_unix(cls, paths, max_order, top_k=3, timeout=600):
+        clients = []
+        for path in paths:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    clients.append(await PredictionClient.connect_unix(path))
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() > deadline:
+                        raise
+                    await asyncio.sleep(0.1)
+
+        return cls(clients, max_order, top_k)
+
+
+    '''
+    Desc: Asks the shard of every order in parallel and merges the suggestions from the highest order
+    Params:
+        words: list - The words preceding the next word or ending with the partial word
+        use_prefix: bool - Whether the last word is a partial word
+    Returns: list - Up to top_k suggestions
+    '''
+    async def _predict(self, words, use_prefix):
+        words = [word.lower() for word in words]
+
+        requests = []
+        for n in range(self.max_order, 0, -1):
+            if len(words) < n:
+                continue
+
+            # the state of order n is found in the shard of its context
+            state = words[-n:]
+            client = self._clients[get_shard(tuple(state[:-1]), len(self._clients))]
+            if use_prefix:
+                requests.append(client.predict_word_endings(state))
+            else:
+                requests.append(client.predict_next_words(state))
+
+        return merge_suggestions(await asyncio.gather(*requests), self.top_k)
+
+
+    '''
+    Desc: Gets the top k next words, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the next word
+    Returns: list - Up to top_k possible next words
+    '''
+    async def predict_next_words(self, words):
+        return await self._predict(words, use_prefix=False)
+
+
+    '''
+    Desc: Gets the top k endings of the last (partial) word, backing off from the highest order to lower ones
+    Params:
+        words: list - The words preceding the partial word followed by the partial word
+    Returns: list - Up to top_k possible word endings
+    '''
+    async def predict_word_endings(self, words):
+        return await self._predict(words, use_prefix=True)
+
+
+    '''
+    Desc: Closes the connections to all shards
+    Params: None
+    Returns: None
+    '''
+    async def close(self):
+        for client in self._clients:
+            await client.close()
@@ -0,0 +1,40 @@
+import asyncio
+
+from code.backend import MarkovChainShard, Parser
+from code.server.prediction_server import PredictionServer
+
+
+'''
+Desc: Serves a shard until the server is closed
+Params:
+    model: MarkovChainShard - The shard
+    socket_path: str - Path to the socket file to listen on
+Returns: None
+'''
+async def serve_shard(model, socket_path):
+    server = PredictionServer(model)
+    await server.start_unix(socket_path)
+    await server.serve_forever()
+
+
+'''
+Desc: Builds a shard from the parsed data and serves it on a Unix socket, meant to run in its own
+      process, the socket is opened only after the shard is built
+Params:
+    parsed_data_path: str - Path to the parsed data file
+    max_order: int - The highest order of the Markov chains
+    shard_index: int - The index of the shard
+    shard_count: int - The number of shards
+    socket_path: str - Path to the socket file to listen on
+    top_k: int - The number of suggestions of every order (default: 3)
+Returns: None
+'''
+def run_shard_worker(parsed_data_path, max_order, shard_index, shard_count, socket_path, top_k=3):
+    parsed_data = Parser().load_parsed_data(parsed_data_path)
+    model = MarkovChainShard(parsed_data, max_order, shard_index, shard_count, top_k)
+    del parsed_data
+
+    try:
+        asyncio.run(serve_shard(model, socket_path))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,85 @@
+from code.backend import MarkovChain, MarkovChainBackoff
+from code.backend import Parser
+from code.backend.evaluator import Evaluator
+import argparse
+import json
+import os
+
+
+'''
+Desc: Builds the Markov chains of every order and the backoff over the orders up to each of them,
+      the chains are shared by all backoffs
+Params:
+    sentences: list - Tokenized training sentences
+    max_order: int - The highest order
+    top_k: int - The number of suggestions
+Returns: dict - The backoff model of every order
+'''
+def build_models(sentences, max_order, top_k):
+    markov_chains = []
+    for n in range(1, max_order + 1):
+        print(f'Building the Markov chain of order {n}')
+        markov_chains.insert(0, MarkovChain(sentences, n, top_k))
+
+    return {
+        n: MarkovChainBackoff(markov_chains[max_order - n:], top_k)
+        for n in range(1, max_order + 1)
+    }
+
+
+'''
+Desc: Loads the training and the held out sentences, without a held out file the last
+      sentences of the parsed data are held out
+Params:
+    args: argparse.Namespace - The command line arguments
+Returns: tuple - The training and the held out sentences
+'''
+def load_sentences(args):
+    parser = Parser()
+    sentences = list(parser.load_parsed_data(args.parsed_data))
+
+    if args.held_out:
+        held_out = list(parser.load_parsed_data(args.held_out))
+    else:
+        split = len(sentences) - int(len(sentences) * args.held_out_fraction)
+        sentences, held_out = sentences[:split], sentences[split:]
+
+    if args.max_sentences:
+        held_out = held_out[:args.max_sentences]
+
+    return sentences, held_out
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Replays held out sentences keystroke by keystroke and reports hit rates, keystroke savings and latencies of every order')
+    arg_parser.add_argument('--parsed-data', default='./parsed_data.bin', help='parsed data the models are built from')
+    arg_parser.add_argument('--held-out', help='parsed data to replay, the last sentences of the parsed data are held out if omitted')
+    arg_parser.add_argument('--held-out-fraction', type=float, default=0.1, help='fraction of the parsed data held out without --held-out')
+    arg_parser.add_argument('--max-sentences', type=int, help='number of held out sentences to replay, all if omitted')
+    arg_parser.add_argument('--max-order', type=int, default=3)
+    arg_parser.add_argument('--top-k', type=int, default=3, help='number of suggestion buttons')
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes replaying the sentences')
+    arg_parser.add_argument('--chunk-size', type=int, default=500, help='number of sentences replayed by a worker at once')
+    arg_parser.add_argument('--output', help='path of the JSON file to write the results to, printed if omitted')
+    args = arg_parser.parse_args()
+
+    sentences, held_out = load_sentences(args)
+    models = build_models(sentences, args.max_order, args.top_k)
+    del sentences
+
+    print(f'Replaying {len(held_out)} sentences with {args.workers} workers')
+    results = json.dumps({
+        'config': vars(args),
+        'held_out_sentences': len(held_out),
+        'orders': Evaluator(models, args.top_k).evaluate(held_out, args.workers, args.chunk_size)
+    }, indent=4)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(results)
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
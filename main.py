@@ -1,39 +1,117 @@
 from PyQt6.QtWidgets import QApplication
 
-from code.backend import MarkovChain
-from code.backend import Parser
 from code.frontend import Window
+import os
 import sys
 
 
-def main():
-    folder_path = './dataset/'
-    parsed_data_folder_path = './parsed_data.json'
-    column_names = ['previous_utterance', 'free_messages', 'guided_messages']
+'''
+Desc: Loads the model from the snapshot file or parses the data, builds the model and saves it to the
+      snapshot file, then learns the sentences learned from typing in earlier sessions. Runs in the
+      loading thread of the window, so pandas, NLTK and numpy are imported after the window is shown
+Params:
+    folder_path: str - Path to the folder with the dataset
+    column_names: list - The columns of the dataset to parse
+    max_nth_order: int - The highest order of the model
+    snapshot_path: str - Path to the snapshot file
+    parse_cache_folder_path: str - Path to the folder of the parse cache
+    fast_tokenizer: bool - Whether to tokenize with regular expressions instead of NLTK
+    learned_sentences_path: str - Path to the file with the sentences learned in earlier sessions
+Returns: CompactNGramModel - The loaded model
+'''
+def load_model(folder_path, column_names, max_nth_order, snapshot_path, parse_cache_folder_path, fast_tokenizer, learned_sentences_path):
+    from code.backend import NGramModel
+    from code.backend import Parser
+    from code.backend import load_learned_sentences, load_snapshot, save_snapshot
 
-    parser = Parser()
+    if not os.path.exists(snapshot_path):
+        parser = Parser(fast_tokenizer=fast_tokenizer)
 
-    '''
-    parse and save data into json file
-    '''
-    # parsed_data = parser.parse_data(folder_path, column_names, parsed_data_folder_path)
+        '''
+        parse data, only new or changed files are parsed, the others are loaded from the parse cache
+        '''
+        parsed_data = parser.parse_data(folder_path, column_names, workers=os.cpu_count(), cache_folder_path=parse_cache_folder_path)
+
+        '''
+        parse and save data into corpus file
+        '''
+        # parsed_data = parser.parse_data(folder_path, column_names, './parsed_data.bin', workers=os.cpu_count())
+
+        '''
+        stream parsed sentences straight into the model without keeping them in memory
+        '''
+        # parsed_data = parser.iter_parsed_data(folder_path, column_names)
+
+        '''
+        load parsed data from corpus file
+        '''
+        # parsed_data = parser.load_parsed_data('./parsed_data.bin')
+
+        # build all orders of the model in a single pass over the data
+        save_snapshot(NGramModel(parsed_data, max_nth_order), snapshot_path)
 
     '''
-    load parsed data from json file
+    load built model from snapshot file, skips parsing and building
+    (delete the snapshot file to rebuild the model)
     '''
-    parsed_data = parser.load_parsed_data(parsed_data_folder_path)
-    
-    # create markov chains in reverse order to get the most complex model first
-    max_nth_order = 3
-    markov_chains = [MarkovChain(parsed_data, i) for i in range(max_nth_order, 0, -1)]
+    model = load_snapshot(snapshot_path)
+
+    # the snapshot holds the parsed data only, the sentences learned in earlier sessions are learned again
+    # on top of the memory-mapped arrays, which is fast because there are few of them
+    model.update(load_learned_sentences(learned_sentences_path))
+    return model
+
+
+'''
+Desc: Loads the parsed data from the corpus file, runs in the loading thread of the window
+Params:
+    parsed_data_folder_path: str - Path to the corpus file with the parsed data
+Returns: TokenCorpus - The tokenized sentences
+'''
+def load_parsed_data(parsed_data_folder_path):
+    from code.backend import Parser
+    return Parser().load_parsed_data(parsed_data_folder_path)
 
 
+def main():
+    folder_path = './dataset/'
+    parsed_data_folder_path = './parsed_data.bin'
+    parse_cache_folder_path = './parse_cache/'
+    snapshot_path = './model_snapshot.bin'
+    learned_sentences_path = './learned_sentences.jsonl'
+    column_names = ['previous_utterance', 'free_messages', 'guided_messages']
+    max_nth_order = 3
+    # fast_tokenizer=True tokenizes with regular expressions instead of NLTK, several times faster,
+    # delete the snapshot file after changing it. Typed sentences are tokenized the same way
+    fast_tokenizer = False
+
+    # the window is shown right away, the model is loaded in the background and
+    # suggestions start as soon as it is ready
     app = QApplication(sys.argv)
     window = Window(800, 600)
-
-    window.set_markov_chains(markov_chains)
     window.show()
 
+    '''
+    learn from the sentences typed in the editor, they are saved to the learned sentences file and learned
+    again at every start (delete the file to forget them)
+    '''
+    learn_from_typing = True
+    window.load_model(
+        lambda: load_model(
+            folder_path, column_names, max_nth_order, snapshot_path, parse_cache_folder_path,
+            fast_tokenizer, learned_sentences_path
+        ),
+        learn_from_typing,
+        learned_sentences_path,
+        fast_tokenizer
+    )
+
+    '''
+    build the Markov chains of every order from parsed data in corpus file instead, the lowest
+    order is used as soon as it is built while the higher orders are still building
+    '''
+    # window.load_markov_chains(lambda: load_parsed_data(parsed_data_folder_path), max_nth_order)
+
     sys.exit(app.exec())
 
 
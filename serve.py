@@ -0,0 +1,104 @@
+from code.backend import NGramModel
+from code.backend import Parser
+from code.backend import load_snapshot, save_snapshot
+from code.backend import SuggestionCache
+from code.server import PredictionServer, ShardRouter, run_shard_worker
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+
+
+'''
+Desc: Loads the model from the snapshot file, the model is built and saved first if the snapshot does not exist
+Params:
+    snapshot_path: str - Path to the snapshot file
+    parsed_data_folder_path: str - Path to the parsed data used to build the model
+    max_nth_order: int - The highest order of the model
+Returns: CompactNGramModel or NGramModel - The model
+'''
+def load_model(snapshot_path, parsed_data_folder_path, max_nth_order):
+    if os.path.exists(snapshot_path):
+        return load_snapshot(snapshot_path)
+
+    parsed_data = Parser().load_parsed_data(parsed_data_folder_path)
+    model = NGramModel(parsed_data, max_nth_order)
+    save_snapshot(model, snapshot_path)
+    return model
+
+
+'''
+Desc: Serves predictions of one model to all clients until interrupted
+Params:
+    model: CompactNGramModel or NGramModel - The model
+    args: argparse.Namespace - The command line arguments
+Returns: None
+'''
+async def serve(model, args):
+    server = PredictionServer(model)
+    if args.unix:
+        await server.start_unix(args.unix)
+    else:
+        await server.start_tcp(args.host, args.port)
+
+    print(f"Serving predictions on {', '.join(str(address) for address in server.get_addresses())}")
+    await server.serve_forever()
+
+
+'''
+Desc: Starts a shard worker process for every shard and serves predictions of all shards
+      through a router until interrupted
+Params:
+    parsed_data_folder_path: str - Path to the parsed data every shard is built from
+    max_nth_order: int - The highest order of the Markov chains
+    args: argparse.Namespace - The command line arguments
+Returns: None
+'''
+async def serve_sharded(parsed_data_folder_path, max_nth_order, args):
+    with tempfile.TemporaryDirectory() as socket_folder_path:
+        socket_paths = [os.path.join(socket_folder_path, f'shard_{i}.sock') for i in range(args.shards)]
+        workers = [
+            multiprocessing.Process(
+                target=run_shard_worker,
+                args=(parsed_data_folder_path, max_nth_order, i, args.shards, socket_path),
+                daemon=True
+            )
+            for i, socket_path in enumerate(socket_paths)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            print(f'Building {args.shards} shards')
+            router = await ShardRouter.connect_unix(socket_paths, max_nth_order)
+            await serve(router, args)
+        finally:
+            for worker in workers:
+                worker.terminate()
+
+
+def main():
+    parsed_data_folder_path = './parsed_data.bin'
+    snapshot_path = './model_snapshot.bin'
+    max_nth_order = 3
+
+    arg_parser = argparse.ArgumentParser(description='Headless prediction server, one JSON request per line')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--unix', help='path of a Unix socket to listen on instead of the TCP port')
+    arg_parser.add_argument('--shards', type=int, default=1, help='number of worker processes the Markov chains are partitioned across')
+    args = arg_parser.parse_args()
+
+    try:
+        if args.shards > 1:
+            asyncio.run(serve_sharded(parsed_data_folder_path, max_nth_order, args))
+        else:
+            model = SuggestionCache(load_model(snapshot_path, parsed_data_folder_path, max_nth_order))
+            asyncio.run(serve(model, args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
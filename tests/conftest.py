@@ -0,0 +1,8 @@
+import pytest
+
+from corpus import generate_sentences
+
+
+@pytest.fixture(scope='session')
+def sentences():
+    return generate_sentences(0, 1500, 150)
@@ -0,0 +1,59 @@
+import random
+
+
+'''
+Desc: Generates random tokenized sentences over a small vocabulary of short words, so that contexts
+      repeat, counts tie and many words share prefixes
+Params:
+    seed: int - The seed of the random generator
+    sentence_count: int - The number of sentences
+    vocabulary_size: int - The number of distinct words
+Returns: list - Tokenized sentences
+'''
+def generate_sentences(seed, sentence_count, vocabulary_size):
+    rng = random.Random(seed)
+    words = sorted({''.join(rng.choice('abcde') for _ in range(rng.randint(1, 5))) for _ in range(vocabulary_size)})
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return [rng.choices(words, weights, k=rng.randint(0, 12)) for _ in range(sentence_count)]
+
+
+'''
+Desc: Collects every next word query and every word ending query the sentences give rise to
+Params:
+    sentences: list - Tokenized sentences
+    max_order: int - The highest order of the model
+Returns: tuple - The next word queries and the word ending queries, lists of words
+'''
+def collect_queries(sentences, max_order):
+    contexts = set()
+    for sentence in sentences:
+        for i in range(len(sentence)):
+            for length in range(max_order + 1):
+                if i - length + 1 >= 0:
+                    contexts.add(tuple(sentence[i - length + 1:i + 1]))
+
+    partial_queries = set()
+    for context in contexts:
+        if context:
+            for length in range(len(context[-1]) + 1):
+                partial_queries.add(context[:-1] + (context[-1][:length],))
+
+    return [list(context) for context in sorted(contexts)], [list(query) for query in sorted(partial_queries)]
+
+
+'''
+Desc: Asserts that a Markov chain answers every query of its order like the baseline Markov chain
+Params:
+    markov_chain: object - The Markov chain to check
+    baseline: BaselineMarkovChain - The baseline Markov chain of the same order
+    sentences: list - The tokenized sentences both chains were built from
+    n: int - The order of the Markov chains
+Returns: None
+'''
+def assert_answers_like_baseline(markov_chain, baseline, sentences, n):
+    next_word_queries, word_ending_queries = collect_queries(sentences, n)
+    next_word_queries += [[word.upper() for word in words] for words in next_word_queries[:100]] + [['unknown'] * n]
+    for words in next_word_queries:
+        assert markov_chain.get_words(tuple(words)) == baseline.get_words(tuple(words))
+    for words in word_ending_queries:
+        assert markov_chain.get_words_with_prefix(tuple(words)) == baseline.get_words_with_prefix(tuple(words))
@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from code.backend import MarkovChain, MarkovChainBackoff, NGramModel
+from corpus import collect_queries
+
+
+@pytest.fixture(scope='module', params=[1, 2, 3])
+def models(request, sentences):
+    model = NGramModel(sentences, request.param)
+    markov_chains = [MarkovChain(sentences, n) for n in range(request.param, 0, -1)]
+    return [model, model.to_compact_model(), MarkovChainBackoff(markov_chains)]
+
+
+def test_batch_answers_like_single_queries(models, sentences):
+    next_word_queries, word_ending_queries = collect_queries(sentences, models[0].max_order)
+    contexts = next_word_queries + [words[:-1] for words in word_ending_queries]
+    partial_words = [None] * len(next_word_queries) + [words[-1] for words in word_ending_queries]
+
+    # repeated, upper case and unknown words, in a shuffled order
+    contexts += [[word.upper() for word in context] for context in contexts[:200]] + [['unknown', 'a']] * 20
+    partial_words += partial_words[:200] + ['a'] * 10 + [None] * 10
+    order = list(range(len(contexts))) * 2
+    random.Random(0).shuffle(order)
+    contexts = [contexts[i] for i in order]
+    partial_words = [partial_words[i] for i in order]
+
+    for model in models:
+        expected = [
+            model.predict_next_words(context) if partial_word is None else model.predict_word_endings(context + [partial_word])
+            for context, partial_word in zip(contexts, partial_words)
+        ]
+        assert model.predict_batch(contexts, partial_words) == expected
+        assert model.predict_batch(contexts[:64], partial_words[:64]) == expected[:64]
@@ -0,0 +1,12 @@
+import pytest
+
+from baseline_markov_chain import MarkovChain as BaselineMarkovChain
+from code.backend import CompactMarkovChain, TokenCorpus
+from corpus import assert_answers_like_baseline
+
+
+@pytest.mark.parametrize('n', [1, 2, 3])
+def test_answers_like_baseline(sentences, n):
+    baseline = BaselineMarkovChain(sentences, n)
+    assert_answers_like_baseline(CompactMarkovChain(sentences, n), baseline, sentences, n)
+    assert_answers_like_baseline(CompactMarkovChain(TokenCorpus.from_sentences(sentences), n), baseline, sentences, n)
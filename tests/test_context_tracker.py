@@ -0,0 +1,42 @@
+import os
+import random
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtWidgets import QApplication, QTextEdit
+
+from code.frontend.context_tracker import ContextTracker
+
+
+@pytest.fixture(scope='module')
+def text_edit():
+    app = QApplication.instance() or QApplication([])
+    # the document of a text edit has a layout, a document without one does not report its changes
+    yield QTextEdit()
+    app.processEvents()
+
+
+def test_words_are_split_words_after_edits(text_edit):
+    rng = random.Random(0)
+    document = text_edit.document()
+    context_tracker = ContextTracker(document)
+    cursor = QTextCursor(document)
+
+    for _ in range(2000):
+        length = document.characterCount() - 1
+        position = rng.randint(0, length)
+        cursor.setPosition(position)
+        if length and rng.random() < 0.3:
+            # removes a selection, possibly a whole word and the spaces around it
+            cursor.setPosition(min(length, position + rng.randint(1, 4)), QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+        else:
+            cursor.insertText(''.join(rng.choice('ab  \n\t') for _ in range(rng.randint(1, 3))))
+
+        # mostly typing at the end of the text, where the scanned words are reused
+        text = document.toPlainText()
+        position = len(text) if rng.random() < 0.5 else rng.randint(0, len(text))
+        for n in [1, 2, 3]:
+            assert context_tracker.get_words(position, n) == text[:position].split()[-n:]
@@ -0,0 +1,24 @@
+import pytest
+
+from code.backend import NGramModel, load_snapshot, save_snapshot
+from corpus import collect_queries, generate_sentences
+
+
+@pytest.mark.parametrize('max_order', [1, 2, 3])
+def test_snapshot_learns_like_rebuilt_model(tmp_path, sentences, max_order):
+    # the learned sentences bring new words, new contexts and more counts of known ones
+    learned = generate_sentences(1, 200, 200) + [['zz', 'zza', 'a'], ['abz'], ['a', 'zz', 'zz', 'zza']]
+    snapshot_path = tmp_path / 'snapshot.bin'
+    save_snapshot(NGramModel(sentences, max_order), snapshot_path)
+
+    model = load_snapshot(snapshot_path)
+    for i in range(0, len(learned), 50):
+        model.update(learned[i:i + 50])
+    expected = NGramModel(sentences + learned, max_order)
+
+    next_word_queries, word_ending_queries = collect_queries(sentences + learned, max_order)
+    for words in next_word_queries:
+        assert model.predict_next_words(words) == expected.predict_next_words(words)
+    for words in word_ending_queries:
+        assert model.predict_word_endings(words) == expected.predict_word_endings(words)
+    assert model.predict_batch(next_word_queries) == [expected.predict_next_words(words) for words in next_word_queries]
@@ -0,0 +1,42 @@
+import pytest
+
+from baseline_markov_chain import MarkovChain as BaselineMarkovChain
+from code.backend import MarkovChain
+from code.backend.ranking import rank_top_states
+from corpus import assert_answers_like_baseline, collect_queries, generate_sentences
+
+
+@pytest.mark.parametrize('n', [1, 2, 3])
+def test_answers_like_baseline(sentences, n):
+    assert_answers_like_baseline(MarkovChain(sentences, n), BaselineMarkovChain(sentences, n), sentences, n)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3])
+@pytest.mark.parametrize('options', [{}, {'min_count': 2, 'max_fanout': 3}, {'keep_distributions': False}])
+def test_parallel_build_is_serial_build(monkeypatch, sentences, n, options):
+    serial = MarkovChain(sentences, n, **options)
+    # small chunks, so that several of them are counted and merged
+    monkeypatch.setattr(MarkovChain, 'PARALLEL_CHUNK_SIZE', 200)
+    parallel = MarkovChain(iter(sentences), n, workers=2, **options)
+
+    assert list(parallel._chain.items()) == list(serial._chain.items())
+    assert list(parallel._totals.items()) == list(serial._totals.items())
+    assert parallel._top_states == serial._top_states
+    for words in collect_queries(sentences, n)[1]:
+        assert parallel.get_words_with_prefix(tuple(words)) == serial.get_words_with_prefix(tuple(words))
+
+
+@pytest.mark.parametrize('n', [1, 2, 3])
+@pytest.mark.parametrize('budget', [{'min_count': 2}, {'max_fanout': 2}, {'min_count': 2, 'max_fanout': 3}])
+def test_update_keeps_memory_budget(sentences, n, budget):
+    markov_chain = MarkovChain(sentences, n, **budget)
+    new_sentences = generate_sentences(1, 400, 200)
+    for i in range(0, len(new_sentences), 40):
+        markov_chain.update(new_sentences[i:i + 40])
+
+    for current_state, transition_states in markov_chain._chain.items():
+        assert min(transition_states.values()) >= budget.get('min_count', 1)
+        assert len(transition_states) <= budget.get('max_fanout', len(transition_states))
+        assert markov_chain._top_states[current_state] == rank_top_states(transition_states, 3)
+    assert markov_chain._transition_count == sum(len(transition_states) for transition_states in markov_chain._chain.values())
+    assert set(markov_chain._top_states) == set(markov_chain._chain)
@@ -0,0 +1,19 @@
+import pytest
+
+from baseline_markov_chain import MarkovChain as BaselineMarkovChain
+from code.backend import MarkovChainBackoff, NGramModel
+from corpus import collect_queries
+
+
+@pytest.mark.parametrize('max_order', [1, 2, 3])
+def test_answers_like_baseline_backoff(sentences, max_order):
+    model = NGramModel(sentences, max_order)
+    backoff = MarkovChainBackoff([BaselineMarkovChain(sentences, n) for n in range(max_order, 0, -1)])
+
+    next_word_queries, word_ending_queries = collect_queries(sentences, max_order)
+    next_word_queries += [[word.upper() for word in words] for words in next_word_queries[:100]] + [['unknown', 'a']]
+    for compared_model in [model, model.to_compact_model()]:
+        for words in next_word_queries:
+            assert compared_model.predict_next_words(words) == backoff.predict_next_words(words)
+        for words in word_ending_queries:
+            assert compared_model.predict_word_endings(words) == backoff.predict_word_endings(words)